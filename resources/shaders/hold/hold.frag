@@ -0,0 +1,45 @@
+#version 330 core
+
+in vec2 localPos;
+
+out vec4 fragColor;
+
+uniform sampler2D texture;
+uniform vec4 color;
+
+uniform vec2 headSize;
+uniform vec2 bodySize;
+uniform vec2 tailSize;
+
+// 各部分在图集中的 UV 区域
+uniform vec4 headUvRect;
+uniform vec4 bodyUvRect;
+uniform vec4 tailUvRect;
+
+void main() {
+    vec2 size;
+    vec4 uvRect;
+    float v;
+
+    if (localPos.y < 0.) {  // 长条头
+        size = headSize;
+        uvRect = headUvRect;
+        v = (localPos.y + headSize.y) / headSize.y;
+    } else if (localPos.y < bodySize.y) {  // 长条身 (纹理拉伸)
+        size = bodySize;
+        uvRect = bodyUvRect;
+        v = localPos.y / bodySize.y;
+    } else {  // 长条尾
+        size = tailSize;
+        uvRect = tailUvRect;
+        v = (localPos.y - bodySize.y) / tailSize.y;
+    }
+
+    if (abs(localPos.x) > size.x / 2) {
+        discard;
+    }
+
+    vec2 texCoord = uvRect.xy + vec2(localPos.x / size.x + 0.5, v) * uvRect.zw;
+
+    fragColor = texture2D(texture, texCoord) * color;
+}
\ No newline at end of file
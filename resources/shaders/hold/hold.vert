@@ -0,0 +1,34 @@
+#version 330 core
+
+in vec2 in_pos;
+
+out vec2 localPos;
+
+uniform vec2 position;
+uniform float rotation;
+uniform float isAbove;
+
+// 各部分的像素尺寸 (长条头 / 长条身 / 长条尾)，长条身的高度为当前长度
+uniform vec2 headSize;
+uniform vec2 bodySize;
+uniform vec2 tailSize;
+uniform bool showHead;
+
+uniform vec2 screenSize;
+
+void main() {
+    // 长条局部坐标: x 沿判定线方向，y 沿法线方向 (未乘 isAbove)，长条身从 y = 0 开始
+    float halfWidth = max(max(headSize.x, bodySize.x), tailSize.x) / 2;
+    float bottom = showHead ? -headSize.y : 0.;
+    float top = bodySize.y + tailSize.y;
+
+    localPos = vec2(in_pos.x * halfWidth, mix(bottom, top, (in_pos.y + 1) / 2));
+
+    float c = cos(radians(rotation));
+    float s = sin(radians(rotation));
+    mat2 rotMat = mat2(c, -s, s, c);
+
+    vec2 realPos = ((vec2(localPos.x, localPos.y * isAbove) * 2) * rotMat + position * 2) / screenSize;
+
+    gl_Position = vec4(realPos, 0., 1.);
+}
\ No newline at end of file
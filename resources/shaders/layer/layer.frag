@@ -0,0 +1,10 @@
+#version 330 core
+
+out vec4 fragColor;
+
+uniform sampler2D texture;
+
+void main() {
+    // 图层与屏幕尺寸相同，逐像素读取，不经过过滤
+    fragColor = texelFetch(texture, ivec2(gl_FragCoord.xy), 0);
+}
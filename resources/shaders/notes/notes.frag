@@ -0,0 +1,11 @@
+#version 330 core
+
+in vec2 texCoord;
+
+out vec4 fragColor;
+
+uniform sampler2D texture;
+
+void main() {
+    fragColor = texture2D(texture, texCoord);
+}
\ No newline at end of file
@@ -0,0 +1,106 @@
+#version 330 core
+
+in vec2 in_pos;
+in vec2 in_texCoord;
+
+// 静态实例属性 (每个 Note 部件一个实例)
+in int in_line;
+in vec4 in_note;  // time, endTime, positionX, floorPosition (时间与 floorPosition 为高位)
+in vec3 in_noteLow;  // time, endTime, floorPosition 的低位
+in vec4 in_motion;  // speed, isAbove, holdSpeed, length
+in int in_part;  // 0: 普通 Note, 1: 长条头, 2: 长条身, 3: 长条尾
+in vec2 in_size;
+in vec2 in_scale;
+in vec2 in_anchor;
+in vec4 in_uvRect;
+
+out vec2 texCoord;
+
+// 每条判定线一列: 第一行 (x, y, rotate, floorPosition 高位)，第二行 (floorPosition 低位, 0, 0, 0)
+uniform sampler2D lineStates;
+
+uniform float nowTime;
+uniform float nowTimeLow;
+uniform float threshold;
+uniform vec2 screenSize;
+
+void cull() {
+    // 所有顶点都在裁剪空间外，图元被直接丢弃
+    gl_Position = vec4(2., 2., 2., 1.);
+    texCoord = vec2(0.);
+}
+
+// 高位 + 低位表示的两数之差，两数接近时高位相减没有误差，不会因两个大数相减丢失精度
+float difference(float aHigh, float aLow, float bHigh, float bLow) {
+    return (aHigh - bHigh) + (aLow - bLow);
+}
+
+void main() {
+    vec4 line = texelFetch(lineStates, ivec2(in_line, 0), 0);
+    float lineFloorPositionLow = texelFetch(lineStates, ivec2(in_line, 1), 0).x;
+
+    float speed = in_motion.x;
+    float isAbove = in_motion.y;
+    float holdSpeed = in_motion.z;
+    float noteLength = in_motion.w;
+
+    float sinceTime = difference(nowTime, nowTimeLow, in_note.x, in_noteLow.x);  // nowTime - time
+    float sinceEndTime = difference(nowTime, nowTimeLow, in_note.y, in_noteLow.y);  // nowTime - endTime
+
+    bool isHold = in_part != 0;
+    bool isHit = sinceTime >= 0.;
+    bool isHolding = isHit && isHold && sinceEndTime <= 0.;
+
+    if (isHit && !isHolding) {  // 已退场
+        cull();
+        return;
+    }
+
+    float nowLength;
+    float floorPosition;
+    float endFloorPosition;
+
+    if (isHolding) {
+        nowLength = noteLength - sinceTime * holdSpeed;
+        floorPosition = 0.;
+        endFloorPosition = nowLength;
+    } else {
+        nowLength = noteLength;
+        floorPosition = difference(in_note.w, in_noteLow.z, line.w, lineFloorPositionLow) * speed;
+        endFloorPosition = floorPosition + nowLength;
+    }
+
+    // 超出阈值、遮罩、长度为 0 的长条、已打击长条的头部
+    if (floorPosition > threshold || floorPosition < -0.0001 ||
+        (isHold && noteLength == 0.) || (in_part == 1 && isHit)) {
+        cull();
+        return;
+    }
+
+    float c = cos(radians(line.z));
+    float s = sin(radians(line.z));
+    float normalC = cos(radians(line.z + 90.));
+    float normalS = sin(radians(line.z + 90.));
+
+    vec2 basePos = line.xy + vec2(c, s) * in_note.z;
+    vec2 position = basePos + vec2(normalC, normalS) *
+        ((in_part == 3 ? endFloorPosition : floorPosition) * isAbove);
+
+    vec2 scale = in_scale;
+
+    if (in_part == 1 || in_part == 3) {
+        scale.y *= isAbove;
+    } else if (in_part == 2) {
+        scale.y *= nowLength * isAbove;
+    }
+
+    vec2 anchorOffset = (- (in_anchor - 0.5)) * in_size * 2;
+
+    mat2 rotMat = mat2(c, -s, s, c);
+
+    vec2 realPos = ((in_size * in_pos + anchorOffset) * scale * rotMat + position * 2) / screenSize;
+
+    gl_Position = vec4(realPos, 0., 1.);
+
+    texCoord = in_uvRect.xy + in_texCoord * in_uvRect.zw;
+}
\ No newline at end of file
@@ -0,0 +1,10 @@
+#version 330 core
+
+in vec2 texCoord;
+in vec4 color;
+
+out vec4 fragColor;
+
+void main() {
+    fragColor = color;
+}
\ No newline at end of file
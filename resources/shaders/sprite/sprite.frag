@@ -0,0 +1,12 @@
+#version 330 core
+
+in vec2 texCoord;
+in vec4 color;
+
+out vec4 fragColor;
+
+uniform sampler2D texture;
+
+void main() {
+    fragColor = texture2D(texture, texCoord) * color;
+}
\ No newline at end of file
@@ -0,0 +1,33 @@
+#version 330 core
+
+in vec2 in_pos;
+in vec2 in_texCoord;
+
+// 实例属性
+in vec2 in_position;
+in vec2 in_size;
+in vec2 in_scale;
+in vec2 in_anchor;
+in float in_rotation;
+in vec4 in_color;
+in vec4 in_uvRect;
+
+out vec2 texCoord;
+out vec4 color;
+
+uniform vec2 screenSize;
+
+void main() {
+    vec2 anchorOffset = (- (in_anchor - 0.5)) * in_size * 2;
+
+    float c = cos(radians(in_rotation));
+    float s = sin(radians(in_rotation));
+    mat2 rotMat = mat2(c, -s, s, c);
+
+    vec2 realPos = ((in_size * in_pos + anchorOffset) * in_scale * rotMat + in_position * 2) / screenSize;
+
+    gl_Position = vec4(realPos, 0., 1.);
+
+    texCoord = in_uvRect.xy + in_texCoord * in_uvRect.zw;
+    color = in_color;
+}
\ No newline at end of file
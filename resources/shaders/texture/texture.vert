@@ -10,6 +10,7 @@ uniform vec2 textureSize;
 uniform vec2 anchor;
 uniform float rotation;
 uniform vec2 scale;
+uniform vec4 uvRect;
 
 uniform vec2 screenSize;
 
@@ -24,5 +25,5 @@ void main() {
 
     gl_Position = vec4(realPos, 0., 1.);
 
-    texCoord = in_texCoord;
+    texCoord = uvRect.xy + in_texCoord * uvRect.zw;
 }
\ No newline at end of file
@@ -0,0 +1,50 @@
+#version 330 core
+
+out vec4 fragColor;
+
+uniform sampler2D texture;
+uniform ivec2 frameSize;
+uniform ivec2 chromaSize;
+
+// 以左上角为原点读取画面 (同时完成垂直翻转)
+vec3 fetch(ivec2 pos) {
+    return texelFetch(texture, ivec2(pos.x, frameSize.y - 1 - pos.y), 0).rgb;
+}
+
+void main() {
+    // 输出纹理按行读取后即为 I420 数据: Y 平面、U 平面、V 平面依次排列
+    ivec2 coord = ivec2(gl_FragCoord.xy);
+    int index = coord.y * frameSize.x + coord.x;
+
+    int lumaSize = frameSize.x * frameSize.y;
+    int chromaPlaneSize = chromaSize.x * chromaSize.y;
+
+    float value = 0.;
+
+    // BT.601 有限范围，与 ffmpeg 默认的 rgb24 -> yuv420p 转换一致
+    if (index < lumaSize) {
+        vec3 color = fetch(ivec2(index % frameSize.x, index / frameSize.x));
+
+        value = 16. + dot(color, vec3(65.481, 128.553, 24.966));
+    } else if (index < lumaSize + chromaPlaneSize * 2) {
+        int chromaIndex = index - lumaSize;
+        bool isV = chromaIndex >= chromaPlaneSize;
+
+        if (isV) {
+            chromaIndex -= chromaPlaneSize;
+        }
+
+        // 取 2x2 像素的平均值，奇数尺寸时最后一行 / 列只取边缘像素
+        ivec2 pos = ivec2(chromaIndex % chromaSize.x, chromaIndex / chromaSize.x) * 2;
+        ivec2 nextPos = min(pos + 1, frameSize - 1);
+
+        vec3 color = (fetch(pos) + fetch(ivec2(nextPos.x, pos.y)) +
+                      fetch(ivec2(pos.x, nextPos.y)) + fetch(nextPos)) * 0.25;
+
+        value = isV ? 128. + dot(color, vec3(112., -93.786, -18.214))
+                    : 128. + dot(color, vec3(-37.797, -74.203, 112.));
+    }
+
+    // Alpha 为 1，开启混合时结果与直接写入相同
+    fragColor = vec4(value / 255., 0., 0., 1.);
+}
@@ -14,14 +14,36 @@ ARG_TYPE_HINTS: dict[str, Type] = {
 
     "resources_dir": str,
 
+    "package_path": str,
+
     "ill_blurriness": float,
     "ill_brightness": float,
 
+    "cache_background": bool,
+    "batch_sprites": bool,
+    "cull_offscreen": bool,
+    "use_draw_list": bool,
+    "gpu_notes": bool,
+
+    "use_numba": bool,
+
+    "chart_load_workers": int,
+    "chart_load_executor": str,
+
+    "use_chart_cache": bool,
+    "chart_cache_dir": str,
+
     "render": bool,
     "video_output_path": str,
     "encoder": str,
     "video_fps": int,
-    "video_bitrate": str
+    "video_bitrate": str,
+    "gpu_yuv": bool,
+    "readback_buffers": int,
+    "video_write_queue": int,
+    "render_workers": int,
+    "skip_static_frames": bool,
+    "render_chunk_seconds": float
 }
 
 # 参数类型转换器
@@ -0,0 +1,191 @@
+from dataclasses import asdict, fields
+from typing import Any
+import json
+import os
+import sys
+import time
+
+from loguru import logger
+
+from .config import *
+from .arg_specs import *
+from .arg_parser import ArgParser
+from .chart_package import ChartPackage
+from .video_renderer import VideoRenderer
+
+
+# 批量渲染工具额外的命令行参数
+BATCH_ARG_TYPE_HINTS: dict[str, type] = {
+    "manifest": str,
+    "report": str
+}
+
+# 改变后需要重新创建 PyPR (OpenGL 上下文、着色器、Note 纹理与音效) 的配置项
+CONTEXT_FIELDS = ("width", "height", "resources_dir", "use_numba")
+
+
+class BatchRenderer:
+    """
+    按清单依次渲染多个谱面，所有任务共用一个 PyPR，
+    任务之间只重置谱面、音乐与曲绘，OpenGL 上下文、着色器、Note 纹理与打击音效只在首次使用时加载
+
+    清单为 JSON 列表 (或 {"jobs": [...]})，每项包含
+    chart (谱面文件或谱面包)、music、illustration、output 与 overrides (覆盖的 Config 字段)，
+    谱面包中的音乐与曲绘在未指定 music / illustration 时使用，相对路径以清单所在目录为基准
+    """
+
+    def __init__(self, base_args: dict[str, Any]):
+        self.base_args = base_args
+
+        self.app = None
+        self.context_key: tuple | None = None
+
+    @staticmethod
+    def load_manifest(path: str) -> list[dict[str, Any]]:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+
+        jobs = data["jobs"] if isinstance(data, dict) else data
+        base_dir = os.path.dirname(os.path.abspath(path))
+
+        for job in jobs:
+            for key in ("chart", "music", "illustration", "output"):
+                if job.get(key) and not os.path.isabs(job[key]):
+                    job[key] = os.path.join(base_dir, job[key])
+
+        return jobs
+
+    def get_app(self, config: Config):
+        """
+        影响 OpenGL 资源的配置项不变时复用上一个任务的 PyPR，只更新其余配置项
+        """
+        from .main import PyPR
+
+        context_key = tuple(getattr(config, name) for name in CONTEXT_FIELDS)
+
+        if self.app is None or context_key != self.context_key:
+            self.app = PyPR(args=asdict(config))
+            self.context_key = context_key
+
+            return self.app
+
+        # Player、Renderer 等持有同一个 Config 对象，直接修改字段
+        for field in fields(Config):
+            setattr(self.app.config, field.name, getattr(config, field.name))
+
+        self.app.reset()
+
+        return self.app
+
+    def run_job(self, job: dict[str, Any]) -> dict[str, Any]:
+        start = time.perf_counter()
+
+        config = Config(**(self.base_args | job.get("overrides", {}) | {
+            "render": True,
+            "video_output_path": job.get("output") or self.base_args.get("video_output_path", "output.mp4")
+        }))
+
+        app = self.get_app(config)
+        app.video_renderer = VideoRenderer(app.config)
+
+        chart_path = job["chart"]
+        music, illustration = job.get("music"), job.get("illustration")
+
+        if ChartPackage.is_package(chart_path):
+            with ChartPackage(chart_path) as package:
+                chart_data = package.read_chart()
+                music = music or package.read_music()
+                illustration = illustration or package.read_illustration()
+        else:
+            with open(chart_path, "rb") as f:
+                chart_data = f.read()
+
+        if chart_data is None:
+            raise ValueError("未找到谱面文件")
+
+        if not music:
+            raise ValueError("未指定音乐文件")
+
+        app.import_chart(chart_data)
+        app.import_music(music)
+
+        if illustration:
+            app.import_illustration(illustration)
+
+        load_time = time.perf_counter() - start
+
+        # 渲染失败时结束本任务的 ffmpeg 与写入线程，下一个任务继续使用同一个 OpenGL 上下文
+        try:
+            app.render_video()
+        except BaseException:
+            app.video_renderer.abort()
+
+            raise
+
+        total_time = time.perf_counter() - start
+
+        return {
+            "load_time": load_time,
+            "render_time": total_time - load_time,
+            "total_time": total_time,
+            "frames": app.video_renderer.total_frame
+        }
+
+    def run(self, jobs: list[dict[str, Any]]) -> list[dict[str, Any]]:
+        results = []
+
+        for index, job in enumerate(jobs):
+            logger.info(f"[{index + 1}/{len(jobs)}] 渲染 {job.get('chart')}")
+
+            result = {"chart": job.get("chart"), "output": job.get("output"), "success": False}
+            start = time.perf_counter()
+
+            # import_* 失败时会调用 sys.exit，批量渲染中只跳过当前任务
+            try:
+                result |= self.run_job(job)
+                result["success"] = True
+            except (Exception, SystemExit) as e:
+                import traceback
+
+                logger.error(f"任务失败: {e!r}")
+                logger.error(traceback.format_exc())
+
+                result["error"] = repr(e)
+                result["total_time"] = time.perf_counter() - start
+
+            results.append(result)
+
+        return results
+
+
+if __name__ == "__main__":
+    # python -m src.batch_render --manifest jobs.json [--report report.json] [其他 Config 参数]
+    args = ArgParser.parse(sys.argv, aliases=ARG_ALIASES,
+                           type_hints=ARG_TYPE_HINTS | BATCH_ARG_TYPE_HINTS)
+
+    if "manifest" not in args:
+        logger.error("未指定任务清单 (--manifest)")
+
+        sys.exit(1)
+
+    batch_renderer = BatchRenderer(
+        {key: value for key, value in args.items() if key in ARG_TYPE_HINTS})
+
+    jobs = BatchRenderer.load_manifest(args["manifest"])
+    results = batch_renderer.run(jobs)
+
+    for result in results:
+        status = "成功" if result["success"] else f"失败 ({result['error']})"
+
+        print(f"{result['chart']}: {status}  总耗时 {result['total_time']:.2f} s"
+              + (f"  (加载 {result['load_time']:.2f} s, 渲染 {result['render_time']:.2f} s, {result['frames']} 帧)"
+                 if result["success"] else ""))
+
+    print(f"\n完成 {sum(result['success'] for result in results)} / {len(results)} 个任务，"
+          f"总耗时 {sum(result['total_time'] for result in results):.2f} s")
+
+    if "report" in args:
+        with open(args["report"], "w", encoding="utf-8") as f:
+            json.dump(results, f, ensure_ascii=False, indent=4)
+
+        logger.info(f"已写入批量渲染报告: {args['report']}")
@@ -4,13 +4,22 @@ from typing import Any, Literal
 from abc import ABC, abstractmethod
 from enum import IntEnum
 from collections import deque
-
+from functools import cached_property
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import bisect
+import hashlib
+import math
+import os
+
+import numpy as np
 from loguru import logger
 
 from .renderer import Renderer
+from .draw_list import DrawList
 from .config import *
 from .utils import *
 from .sound_manager import SoundManager
+from .kernels import Kernels
 
 
 class Chart(ABC):
@@ -26,7 +35,14 @@ class Chart(ABC):
         pass
 
     @abstractmethod
-    def render(self, renderer: Renderer, notes_scale: dict[str, float]):
+    def seek(self, now_time: float):
+        """
+        跳转到谱面时间 now_time，不播放跳过部分的打击音效
+        """
+        pass
+
+    @abstractmethod
+    def render(self, renderer: Renderer | DrawList, notes_scale: dict[str, float]):
         pass
 
 
@@ -59,6 +75,19 @@ PHI_NOTE_TEXTURES: dict[str, tuple[str, str | None, str | None]] = {
     PhiNoteTypes.FLICK: ("note-flick", None, None),
 }
 
+PHI_NOTE_WIDTH_RATIO = 0.123  # Note 纹理缩放后的宽度与画面宽度之比
+
+
+# 打包后的事件数组类型 (非移动事件的 start2 / end2 恒为 0)
+PHI_EVENT_DTYPE = np.dtype([
+    ("startTime", np.float64),
+    ("endTime", np.float64),
+    ("start", np.float64),
+    ("end", np.float64),
+    ("start2", np.float64),
+    ("end2", np.float64),
+])
+
 
 class PhiDataConverter:
     width: int
@@ -88,9 +117,7 @@ class PhiDataConverter:
 
 class PhiDataProcessor:
     @staticmethod
-    def init_events(bpm: float, events: list, type: Literal[0, 1, 2, 3]) -> deque:
-        floor_position: float = 0  # 速度事件用
-
+    def init_events(bpm: float, events: list, type: Literal[0, 1, 2, 3]) -> np.ndarray:
         events.sort(key=lambda x: x["startTime"])
 
         for event in events:
@@ -107,119 +134,644 @@ class PhiDataProcessor:
                         event["end"], event["end2"])
 
                 case PhiEventTypes.SPEED:  # 速度事件
-                    event["start"] = floor_position
-
                     event["value"] = PhiDataConverter.convert_speed_event_value(
                         event["value"])
 
-                    event_floor_position = (event["value"] *
-                                            (event["endTime"] - event["startTime"]))
+        packed = PhiDataProcessor.pack_events(events, type)
+
+        if type == PhiEventTypes.SPEED:  # 速度事件的 start / end 为积分得到的 floorPosition
+            PhiDataProcessor.integrate_floor_positions(
+                packed, [event["value"] for event in events])
+
+        return packed
 
-                    end_floor_position = floor_position + event_floor_position
+    @staticmethod
+    def pack_events(events: list, type: Literal[0, 1, 2, 3]) -> np.ndarray:
+        """
+        将事件打包为 PHI_EVENT_DTYPE 数组 (速度事件的 start / end 由 integrate_floor_positions 填充)
+        """
+        packed = np.zeros(len(events), dtype=PHI_EVENT_DTYPE)
 
-                    event["end"] = end_floor_position
-                    floor_position = end_floor_position
+        for index, event in enumerate(events):
+            if type == PhiEventTypes.SPEED:
+                packed[index] = (event["startTime"],
+                                 event["endTime"], 0, 0, 0, 0)
+            else:
+                packed[index] = (
+                    event["startTime"], event["endTime"],
+                    event["start"], event["end"],
+                    event["start2"] if type == PhiEventTypes.MOVE else 0,
+                    event["end2"] if type == PhiEventTypes.MOVE else 0
+                )
 
-        return deque(events)
+        return packed
 
     @staticmethod
-    def get_floor_position(time: float, speed_events: deque):
-        left, right = 0, len(speed_events) - 1
+    def integrate_floor_positions(speed_events: np.ndarray, values: list[float]):
+        """
+        按速度积分得到每个速度事件起止时刻的 floorPosition，写入 speed_events 的 start / end
+        """
+        if Kernels.enabled:
+            start = np.empty(len(speed_events), dtype=np.float64)
+            end = np.empty(len(speed_events), dtype=np.float64)
+
+            Kernels.integrate_floor_positions(
+                np.ascontiguousarray(speed_events["startTime"]),
+                np.ascontiguousarray(speed_events["endTime"]),
+                np.asarray(values, dtype=np.float64), start, end)
+        else:
+            floor_position: float = 0
+            start, end = [], []
 
-        while left <= right:
-            mid = left + (right - left) // 2
-            event = speed_events[mid]
+            for start_time, end_time, value in zip(speed_events["startTime"].tolist(),
+                                                   speed_events["endTime"].tolist(), values):
+                start.append(floor_position)
 
-            if event["startTime"] <= time <= event["endTime"]:
-                progress = ((time - event["startTime"]) /
-                            (event["endTime"] - event["startTime"]))
-                return linear_interpolation(event["start"], event["end"], progress)
+                event_floor_position = value * (end_time - start_time)
+                floor_position = floor_position + event_floor_position
 
-            elif time < event["startTime"]:
-                right = mid - 1
+                end.append(floor_position)
 
-            else:
-                left = mid + 1
+        speed_events["start"] = start
+        speed_events["end"] = end
+
+    @staticmethod
+    def bisect_floor_positions(times: np.ndarray, speed_events: np.ndarray) -> np.ndarray:
+        """
+        所有时刻同步进行的二分查找 (与逐个查找时访问的事件完全一致)，找不到所在事件时为 0
+        """
+        start_times, end_times = speed_events["startTime"], speed_events["endTime"]
+        starts, ends = speed_events["start"], speed_events["end"]
+
+        result = np.zeros(len(times), dtype=np.float64)
+        left = np.zeros(len(times), dtype=np.int64)
+        right = np.full(len(times), len(speed_events) - 1, dtype=np.int64)
+        active = left <= right
 
-        return 0
+        while active.any():
+            mid = np.where(active, left + (right - left) // 2, 0)
+            start_time, end_time = start_times[mid], end_times[mid]
+
+            found = active & (start_time <= times) & (times <= end_time)
+            go_left = active & ~found & (times < start_time)
+            go_right = active & ~found & ~go_left
+
+            with np.errstate(divide="ignore", invalid="ignore"):
+                progress = (times - start_time) / (end_time - start_time)
+            result = np.where(
+                found, starts[mid] + ((ends[mid] - starts[mid]) * progress), result)
+
+            right = np.where(go_left, mid - 1, right)
+            left = np.where(go_right, mid + 1, left)
+            active = (go_left | go_right) & (left <= right)
+
+        return result
 
     @staticmethod
-    def group_notes(notes: deque[dict[str, PhiNote]]) -> deque[deque[PhiNote]]:
-        groups: dict[float, deque[dict[str, PhiNote]]] = {}
+    def get_floor_positions(times: np.ndarray, speed_events: np.ndarray) -> np.ndarray:
+        """
+        批量计算各时刻的 floorPosition，
+        仅被一个速度事件覆盖的时刻直接由 searchsorted 定位，
+        被多个事件覆盖的时刻 (如恰好位于事件边界) 交给 bisect_floor_positions 以保证选中的事件与二分查找一致
+        """
+        times = np.asarray(times, dtype=np.float64)
+        result = np.zeros(len(times), dtype=np.float64)
+
+        if len(speed_events) == 0 or len(times) == 0:
+            return result
 
-        for note in notes:
-            if not note.speed in groups:
-                groups[note.speed] = deque()
+        if Kernels.enabled:
+            Kernels.get_floor_positions(
+                times,
+                np.ascontiguousarray(speed_events["startTime"]),
+                np.ascontiguousarray(speed_events["endTime"]),
+                np.ascontiguousarray(speed_events["start"]),
+                np.ascontiguousarray(speed_events["end"]), result)
 
-            groups[note.speed].append(note)
+            return result
 
-        # 将字典转换为二维队列
-        grouped_notes = [value for value in groups.values()]
+        start_times, end_times = speed_events["startTime"], speed_events["endTime"]
 
-        return grouped_notes
+        # 最后一个 startTime <= time 的事件，其之前事件的 endTime 最大值 >= time 时存在多个覆盖事件
+        indices = np.searchsorted(start_times, times, side="right") - 1
+        max_end_times = np.concatenate(
+            ([-np.inf], np.maximum.accumulate(end_times)))[np.maximum(indices, 0)]
+        max_end_times[indices < 0] = -np.inf
+
+        safe_indices = np.maximum(indices, 0)
+        start_time, end_time = start_times[safe_indices], end_times[safe_indices]
+
+        found = (indices >= 0) & (start_time <= times) & (times <= end_time)
+        ambiguous = max_end_times >= times
+        found &= ~ambiguous
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            progress = (times[found] - start_time[found]) / \
+                (end_time[found] - start_time[found])
+        starts = speed_events["start"][safe_indices[found]]
+        ends = speed_events["end"][safe_indices[found]]
+        result[found] = starts + ((ends - starts) * progress)
+
+        if ambiguous.any():
+            result[ambiguous] = PhiDataProcessor.bisect_floor_positions(
+                times[ambiguous], speed_events)
+
+        return result
 
     @staticmethod
-    def init_notes(bpm: float, speed_events: deque, above_notes: list, below_notes: list) -> deque[deque[PhiNote]]:
-        [i.update({"isAbove": 1}) for i in above_notes]
-        [i.update({"isAbove": -1}) for i in below_notes]
-        all_notes: list[dict[str, float | Any]] = above_notes + below_notes
+    def group_notes(speeds: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        """
+        按 speed 分组，组按首次出现的顺序排列，组内保持原顺序，
+        返回 (重排索引, 组偏移)
+        """
+        _, first_indices, inverse, counts = np.unique(
+            speeds, return_index=True, return_inverse=True, return_counts=True)
 
-        for note in all_notes:
-            note["time"] = PhiDataConverter.tick_to_sec(bpm, note["time"])
-            note["positionX"] = (
-                PhiDataConverter.convert_note_x_pos(note["positionX"]))
-            note["holdTime"] = PhiDataConverter.tick_to_sec(
-                bpm, note["holdTime"])
-            note["floorPosition"] = PhiDataProcessor.get_floor_position(
-                note["time"], speed_events)
+        group_order = np.argsort(first_indices, kind="stable")
+        group_ranks = np.empty_like(group_order)
+        group_ranks[group_order] = np.arange(len(group_order))
 
-            note["visible"] = True
+        order = np.argsort(group_ranks[inverse.reshape(-1)], kind="stable")
+        group_offsets = np.concatenate(([0], np.cumsum(counts[group_order])))
 
-            if note["type"] == PhiNoteTypes.HOLD:
-                note["holdSpeed"] = PhiDataConverter.convert_speed_event_value(
-                    note["speed"])
-                note["speed"] = 1
+        return order, group_offsets
 
-                note["endTime"] = note["time"] + note["holdTime"]
-                note["length"] = (note["holdTime"] * note["holdSpeed"])
+    @staticmethod
+    def init_notes(bpm: float, speed_events: np.ndarray, above_notes: list, below_notes: list) -> PhiNoteArrays:
+        all_notes: list[dict[str, float | Any]] = above_notes + below_notes
 
-                note["visible"] = bool(note["length"])
+        is_above = np.array([1] * len(above_notes) + [-1] * len(below_notes), dtype=np.int8)
+        type = np.array([note["type"] for note in all_notes], dtype=np.int8)
+        time = PhiDataConverter.tick_to_sec(
+            bpm, np.array([note["time"] for note in all_notes], dtype=np.float64))
+        x_pos = PhiDataConverter.convert_note_x_pos(
+            np.array([note["positionX"] for note in all_notes], dtype=np.float64))
+        hold_time = PhiDataConverter.tick_to_sec(
+            bpm, np.array([note["holdTime"] for note in all_notes], dtype=np.float64))
+        speed = np.array([note["speed"] for note in all_notes], dtype=np.float64)
+
+        is_hold = type == PhiNoteTypes.HOLD
+        hold_speed = np.where(
+            is_hold, PhiDataConverter.convert_speed_event_value(speed), 1.0)
+        length = np.where(is_hold, hold_time * hold_speed, 0.0)
+        speed = np.where(is_hold, 1.0, speed)
+
+        floor_position = PhiDataProcessor.get_floor_positions(
+            time, speed_events)
 
         # 按 floorPosition 排序以处理部分特殊情况
-        all_notes.sort(key=lambda note: note["floorPosition"])
-
-        note_objs: list[PhiNote] = [PhiNote(note) for note in all_notes]
+        order = np.argsort(floor_position, kind="stable")
 
         # 按 speed 分组以处理部分特殊情况
-        grouped_notes = PhiDataProcessor.group_notes(deque(note_objs))
+        group_order, group_offsets = PhiDataProcessor.group_notes(speed[order])
+        order = order[group_order]
+
+        return PhiNoteArrays(
+            time=time[order], x_pos=x_pos[order], floor_position=floor_position[order],
+            speed=speed[order], is_above=is_above[order], type=type[order],
+            hold_time=hold_time[order], hold_speed=hold_speed[order], length=length[order],
+            group_offsets=group_offsets
+        )
+
+    @staticmethod
+    def get_event_value(events: np.ndarray, type: Literal[0, 1, 2, 3], now_time: float) -> float | tuple[float, float]:
+        """
+        二分查找 now_time 所在事件 (第一个 endTime > now_time 的事件，不存在时取最后一个) 并插值，
+        不修改事件数组，因此可以按任意顺序查询
+        """
+        index = min(bisect.bisect_right(
+            events["endTime"], now_time), len(events) - 1)
+        start_time, end_time, start, end, start2, end2 = events[index].item()
+
+        event_time = end_time - start_time
+        progress = (
+            ((now_time - start_time) / event_time) if event_time
+            else 1
+        )
+
+        value = linear_interpolation(start, end, progress)
 
-        return grouped_notes
+        if type == PhiEventTypes.MOVE:
+            y_value = linear_interpolation(start2, end2, progress)
+
+            return value, y_value
+        else:
+            return value
+
+
+class PhiEventEvaluator:
+    """
+    将所有判定线的事件按 (事件类型, 判定线) 分段拼接为连续数组，
+    一次向量化计算出所有判定线在某一时刻的位置、角度、不透明度与 floorPosition
+    """
+
+    def __init__(self, lines: list[PhiLine]):
+        self.line_num = len(lines)
+
+        segments = [line.packed_events[type]
+                    for type in PhiEventTypes for line in lines]
+        # 没有事件的段插入一个时长为 0、值为 0 的占位事件
+        segments = [segment if len(segment) else np.zeros(1, dtype=PHI_EVENT_DTYPE)
+                    for segment in segments]
+
+        events = (np.concatenate(segments) if segments
+                  else np.zeros(0, dtype=PHI_EVENT_DTYPE))
+        lengths = np.array([len(segment)
+                           for segment in segments], dtype=np.int64)
+
+        self.start_time = np.ascontiguousarray(events["startTime"])
+        self.end_time = np.ascontiguousarray(events["endTime"])
+        self.start = np.ascontiguousarray(events["start"])
+        self.end = np.ascontiguousarray(events["end"])
+        self.start2 = np.ascontiguousarray(events["start2"])
+        self.end2 = np.ascontiguousarray(events["end2"])
+
+        # 每段第一个与最后一个事件的索引
+        self.first_indices = np.cumsum(lengths) - lengths
+        self.last_indices = self.first_indices + lengths - 1
+
+        self.search_steps = int(lengths.max()).bit_length() if len(
+            lengths) else 0
+
+    def get_event_indices(self, now_time: float) -> np.ndarray:
+        """
+        对每段同时二分查找第一个 endTime > now_time 的事件，找不到时取该段最后一个事件
+        """
+        low = self.first_indices
+        high = self.last_indices
+
+        for _ in range(self.search_steps):
+            mid = (low + high) >> 1
+            passed = self.end_time[mid] <= now_time
+
+            low = np.where(passed, np.minimum(mid + 1, high), low)
+            high = np.where(passed, high, mid)
+
+        return low
+
+    def evaluate(self, now_time: float) -> tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """
+        返回所有判定线的 (x, y, rotate, opacity, floor_position)
+        """
+        if Kernels.enabled:
+            value = np.empty(len(self.first_indices), dtype=np.float64)
+            value2 = np.empty(len(self.first_indices), dtype=np.float64)
+
+            Kernels.evaluate_events(now_time, self.start_time, self.end_time,
+                                    self.start, self.end, self.start2, self.end2,
+                                    self.first_indices, self.last_indices, value, value2)
+        else:
+            indices = self.get_event_indices(now_time)
+
+            start_time = self.start_time[indices]
+            event_time = self.end_time[indices] - start_time
+            progress = np.divide(now_time - start_time, event_time,
+                                 out=np.ones_like(event_time), where=event_time != 0)
+
+            start = self.start[indices]
+            start2 = self.start2[indices]
+            value = start + ((self.end[indices] - start) * progress)
+            value2 = start2 + ((self.end2[indices] - start2) * progress)
+
+        line_num = self.line_num
+
+        return (
+            value[PhiEventTypes.MOVE * line_num:(PhiEventTypes.MOVE + 1) * line_num],
+            value2[PhiEventTypes.MOVE * line_num:(PhiEventTypes.MOVE + 1) * line_num],
+            value[PhiEventTypes.ROTATE * line_num:(PhiEventTypes.ROTATE + 1) * line_num],
+            value[PhiEventTypes.OPACITY * line_num:(PhiEventTypes.OPACITY + 1) * line_num],
+            value[PhiEventTypes.SPEED * line_num:(PhiEventTypes.SPEED + 1) * line_num]
+        )
+
+
+class PhiNoteArrays:
+    """
+    判定线 Note 的结构数组存储 (SoA)，同组 Note 连续存放，
+    第 i 组为 [group_offsets[i], group_offsets[i + 1])
+    """
+
+    def __init__(self, time: np.ndarray, x_pos: np.ndarray, floor_position: np.ndarray,
+                 speed: np.ndarray, is_above: np.ndarray, type: np.ndarray,
+                 hold_time: np.ndarray, hold_speed: np.ndarray, length: np.ndarray,
+                 group_offsets: np.ndarray):
+        self.time = np.asarray(time, dtype=np.float64)
+        self.x_pos = np.asarray(x_pos, dtype=np.float64)
+        self.floor_position = np.asarray(floor_position, dtype=np.float64)
+        self.speed = np.asarray(speed, dtype=np.float64)
+        self.is_above = np.asarray(is_above, dtype=np.int8)  # 1 / -1
+        self.type = np.asarray(type, dtype=np.int8)
+        self.hold_time = np.asarray(hold_time, dtype=np.float64)
+        self.hold_speed = np.asarray(hold_speed, dtype=np.float64)
+        self.length = np.asarray(length, dtype=np.float64)
+        self.group_offsets = np.asarray(group_offsets, dtype=np.int64)
+
+        self.is_hold = self.type == PhiNoteTypes.HOLD
+        self.end_time = np.where(self.is_hold, self.time + self.hold_time,
+                                 self.time)
+        # now_time >= retire_time 时 Note 退场 (长条在 end_time 之后才退场)
+        self.retire_time = np.where(self.is_hold, np.nextafter(self.end_time, np.inf),
+                                    self.time)
+
+    @property
+    def group_num(self) -> int:
+        return len(self.group_offsets) - 1
+
+    def __len__(self) -> int:
+        return len(self.time)
 
     @staticmethod
-    def update_events(events: deque, type: Literal[0, 1, 2, 3], now_time: float) -> float | tuple[float, float]:
-        now_event = events[0]
+    def concatenate(arrays: list[PhiNoteArrays]) -> PhiNoteArrays:
+        """
+        拼接多条判定线的 Note，组索引依次平移
+        """
+        note_nums = np.array([len(notes) for notes in arrays], dtype=np.int64)
+        bases = np.cumsum(note_nums) - note_nums
+
+        return PhiNoteArrays(
+            time=np.concatenate([notes.time for notes in arrays] + [np.zeros(0)]),
+            x_pos=np.concatenate([notes.x_pos for notes in arrays] + [np.zeros(0)]),
+            floor_position=np.concatenate(
+                [notes.floor_position for notes in arrays] + [np.zeros(0)]),
+            speed=np.concatenate([notes.speed for notes in arrays] + [np.zeros(0)]),
+            is_above=np.concatenate(
+                [notes.is_above for notes in arrays] + [np.zeros(0, dtype=np.int8)]),
+            type=np.concatenate([notes.type for notes in arrays] + [np.zeros(0, dtype=np.int8)]),
+            hold_time=np.concatenate([notes.hold_time for notes in arrays] + [np.zeros(0)]),
+            hold_speed=np.concatenate([notes.hold_speed for notes in arrays] + [np.zeros(0)]),
+            length=np.concatenate([notes.length for notes in arrays] + [np.zeros(0)]),
+            group_offsets=np.concatenate(
+                [notes.group_offsets[:-1] + base for notes, base in zip(arrays, bases)] +
+                [[note_nums.sum()]])
+        )
 
-        if now_time < now_event["endTime"]:
-            event_time = (now_event["endTime"] - now_event["startTime"])
-            progress = (
-                ((now_time - now_event["startTime"]) / event_time) if event_time
-                else 1
-            )
+    def compute_states(self, now_time: float, window_starts: list[int], window_lengths: list[int],
+                       window_params: list[tuple[float, ...]]) -> PhiNoteStates:
+        """
+        一次计算若干窗口内 Note 的状态，结果与逐个调用 PhiNote.update 一致。
+        window_params 为每个窗口所属判定线的
+        (x, y, rotate, floor_position, cos, sin, normal_cos, normal_sin, threshold)，
+        其中 cos / sin 为判定线角度的三角函数，normal_cos / normal_sin 为法线方向 (角度 + 90) 的三角函数
+        """
+        if not window_starts:
+            return PhiNoteStates.empty()
+
+        window_starts = np.asarray(window_starts, dtype=np.int64)
+        window_lengths = np.asarray(window_lengths, dtype=np.int64)
+        window_params = np.asarray(window_params, dtype=np.float64)
+
+        if Kernels.enabled:
+            return self._compute_states_kernel(now_time, window_starts, window_lengths, window_params)
+
+        window_firsts = np.cumsum(window_lengths) - window_lengths
+
+        # 将判定线参数展开为与窗口内 Note 一一对应的数组
+        (x_pos, y_pos, rotate, floor_position, cos, sin,
+         normal_cos, normal_sin, threshold) = np.repeat(window_params, window_lengths, axis=0).T
+
+        indices = (np.arange(window_lengths.sum(), dtype=np.int64) +
+                   np.repeat(window_starts - window_firsts, window_lengths))
+
+        time = self.time[indices]
+        length = self.length[indices]
+
+        is_hit = now_time >= time
+        is_holding = is_hit & self.is_hold[indices] & (
+            now_time <= self.end_time[indices])  # 长条长按期间
+        is_retired = is_hit & ~is_holding
+
+        now_length = np.where(is_holding,
+                              length - (now_time - time) *
+                              self.hold_speed[indices],
+                              length)
+        # 长按期间强制将当前 fp 设为 0 以确保长条在判定线上
+        now_floor_position = np.where(is_holding, 0.0,
+                                      (self.floor_position[indices] - floor_position) * self.speed[indices])
+        now_end_floor_position = np.where(is_holding, now_length,
+                                          now_floor_position + now_length)
+
+        # 每个窗口在第一个超出阈值的未退场 Note 处截断
+        is_over = ~is_retired & (now_floor_position > threshold)
+        over_count = np.cumsum(is_over)
+        over_base = np.repeat(
+            over_count[window_firsts] - is_over[window_firsts], window_lengths)
+        keep = ~is_retired & (over_count == over_base)
+
+        indices = indices[keep]
+        now_floor_position = now_floor_position[keep]
+        now_end_floor_position = now_end_floor_position[keep]
+
+        x_pos, y_pos, rotate = x_pos[keep], y_pos[keep], rotate[keep]
+        cos, sin = cos[keep], sin[keep]
+        normal_cos, normal_sin = normal_cos[keep], normal_sin[keep]
+
+        note_x_pos = self.x_pos[indices]
+        is_above = self.is_above[indices]
+        real_floor_position = now_floor_position * is_above
+        real_end_floor_position = now_end_floor_position * is_above
+
+        base_x = x_pos + cos * note_x_pos
+        base_y = y_pos + sin * note_x_pos
+
+        return PhiNoteStates(
+            indices=indices,
+            is_hit=is_hit[keep],
+            now_x=base_x + normal_cos * real_floor_position,
+            now_y=base_y + normal_sin * real_floor_position,
+            now_end_x=base_x + normal_cos * real_end_floor_position,
+            now_end_y=base_y + normal_sin * real_end_floor_position,
+            now_rotate=rotate,
+            now_floor_position=now_floor_position,
+            now_length=now_length[keep]
+        )
 
-            value = linear_interpolation(
-                now_event["start"], now_event["end"], progress)
+    def _compute_states_kernel(self, now_time: float, window_starts: np.ndarray, window_lengths: np.ndarray,
+                               window_params: np.ndarray) -> PhiNoteStates:
+        size = int(window_lengths.sum())
+
+        states = PhiNoteStates(
+            indices=np.empty(size, dtype=np.int64),
+            is_hit=np.empty(size, dtype=bool),
+            now_x=np.empty(size, dtype=np.float64),
+            now_y=np.empty(size, dtype=np.float64),
+            now_end_x=np.empty(size, dtype=np.float64),
+            now_end_y=np.empty(size, dtype=np.float64),
+            now_rotate=np.empty(size, dtype=np.float64),
+            now_floor_position=np.empty(size, dtype=np.float64),
+            now_length=np.empty(size, dtype=np.float64)
+        )
 
-            if type == PhiEventTypes.MOVE:
-                y_value = linear_interpolation(
-                    now_event["start2"], now_event["end2"], progress)
+        count = Kernels.compute_note_states(
+            now_time, window_starts, window_lengths, window_params,
+            self.time, self.x_pos, self.floor_position, self.speed, self.is_above, self.is_hold,
+            self.end_time, self.hold_speed, self.length,
+            states.indices, states.is_hit, states.now_x, states.now_y, states.now_end_x, states.now_end_y,
+            states.now_rotate, states.now_floor_position, states.now_length
+        )
 
-                return value, y_value
-            else:
-                return value
+        return states.slice(0, count)
+
+    def render_states(self, states: PhiNoteStates, renderer: Renderer | DrawList, notes_scale: dict[str, float]):
+        if not len(states.indices):
+            return
+
+        for type, is_hit, is_above, length, now_x, now_y, now_end_x, now_end_y, now_rotate, now_floor_position, now_length in zip(
+                self.type[states.indices].tolist(), states.is_hit.tolist(),
+                self.is_above[states.indices].tolist(), self.length[states.indices].tolist(),
+                states.now_x.tolist(), states.now_y.tolist(),
+                states.now_end_x.tolist(), states.now_end_y.tolist(), states.now_rotate.tolist(),
+                states.now_floor_position.tolist(), states.now_length.tolist()):
+            PhiNote.draw(renderer, notes_scale, type, now_x, now_y, now_end_x, now_end_y, now_rotate,
+                         is_hit, is_above, length, now_length, now_floor_position)
+
+    def get_note(self, index: int) -> PhiNote:
+        """
+        按需创建单个 PhiNote 对象
+        """
+        type = int(self.type[index])
+        length = float(self.length[index])
+
+        return PhiNote({
+            "type": type,
+            "time": float(self.time[index]),
+            "positionX": float(self.x_pos[index]),
+            "floorPosition": float(self.floor_position[index]),
+            "speed": float(self.speed[index]),
+            "isAbove": int(self.is_above[index]),
+            "visible": type != PhiNoteTypes.HOLD or bool(length),
+            "holdTime": float(self.hold_time[index]),
+            "holdSpeed": float(self.hold_speed[index]),
+            "endTime": float(self.end_time[index]),
+            "length": length,
+        })
+
+
+class PhiNoteIndex:
+    """
+    判定线的 Note 窗口索引，记录每组 Note 的时间范围与 floorPosition 范围，
+    每帧只需处理窗口 [未退场的第一个 Note, floorPosition 超出阈值的第一个 Note) 内的 Note
+    """
+
+    def __init__(self, notes: PhiNoteArrays):
+        offsets = notes.group_offsets.tolist()
+        groups = [slice(start, stop)
+                  for start, stop in zip(offsets[:-1], offsets[1:])]
+
+        self.group_offsets: list[int] = offsets[:-1]
+        self.speeds: list[float] = [
+            float(notes.speed[group.start]) for group in groups]
+        self.floor_positions: list[list[float]] = [
+            notes.floor_position[group].tolist() for group in groups]
+        self.times: list[list[float]] = [
+            notes.time[group].tolist() for group in groups]
+        # 每组 Note 退场时间的前缀最大值，retire_times[i][j] <= now_time 表示第 i 组前 j + 1 个 Note 均已退场
+        self.retire_times: list[list[float]] = [
+            np.maximum.accumulate(notes.retire_time[group]).tolist() for group in groups]
+
+        # 每组的 (最早打击时间, 最晚退场时间) 与 (最小 floorPosition, 最大 floorPosition)
+        self.time_ranges: list[tuple[float, float]] = [
+            (float(notes.time[group].min()), retire_times[-1])
+            for group, retire_times in zip(groups, self.retire_times)]
+        self.floor_position_ranges: list[tuple[float, float]] = [
+            (floor_positions[0], floor_positions[-1]) for floor_positions in self.floor_positions]
+
+        # 每组第一个未退场 Note 的索引，时间前进时逐个推进 (均摊 O(1))，倒退时二分查找回退
+        self.cursors: list[int] = [0] * len(groups)
+        self.last_time: float = -math.inf
+
+        # 由 CPU 计算的组，交给 GPU 渲染的组 (见 GPUNoteRenderer) 设为 False
+        self.cpu_groups: list[bool] = [True] * len(groups)
+
+    def update_cursors(self, now_time: float):
+        if now_time >= self.last_time:
+            for group_index, retire_times in enumerate(self.retire_times):
+                cursor = self.cursors[group_index]
+
+                if retire_times[-1] <= now_time:  # 整组已退场
+                    cursor = len(retire_times)
+
+                while cursor < len(retire_times) and retire_times[cursor] <= now_time:
+                    cursor += 1
+
+                self.cursors[group_index] = cursor
         else:
-            events.popleft()
+            self.cursors = [bisect.bisect_right(retire_times, now_time)
+                            for retire_times in self.retire_times]
+
+        self.last_time = now_time
+
+    def get_windows(self, now_time: float, line_floor_position: float, threshold: float):
+        """
+        按组返回 (起始索引, 结束索引)，索引为 PhiNoteArrays 中的全局索引，窗口外的 Note 本帧无需处理
+        """
+        self.update_cursors(now_time)
+
+        for group_offset, cursor, speed, floor_positions, times, floor_position_range, cpu_group in zip(
+                self.group_offsets, self.cursors, self.speeds, self.floor_positions, self.times,
+                self.floor_position_ranges, self.cpu_groups):
+            if cursor >= len(floor_positions) or not cpu_group:
+                continue
+
+            stop = len(floor_positions)
+
+            # 同组 Note 速度相同且按 floorPosition 升序，速度为正时 (fp - line_fp) * speed 单调不减，
+            # 可以直接二分出超出阈值的位置 (留出少量余量，准确的判断在 PhiLine.update_notes 中完成)
+            if speed > 0:
+                max_floor_position = line_floor_position + threshold / speed
+                max_floor_position += abs(max_floor_position) * 1e-9 + 1e-9
+
+                if floor_position_range[1] > max_floor_position:
+                    stop = (cursor if floor_position_range[0] > max_floor_position else
+                            bisect.bisect_right(floor_positions, max_floor_position, cursor))
+
+                    # 已打击的 Note (已退场或正在长按，长按中的长条 floorPosition 固定为 0) 不会截断窗口，
+                    # 判定线速度为负时 floorPosition 倒退，这些 Note 可能位于截断位置之后
+                    while stop < len(times) and times[stop] <= now_time:
+                        stop += 1
+
+                    if stop == cursor:
+                        continue
+
+            yield group_offset + cursor, group_offset + stop
+
+
+class PhiNoteStates:
+    """
+    PhiLine.update_notes 计算出的本帧需要渲染的 Note 状态，indices 为 PhiNoteArrays 中的索引
+    """
+
+    def __init__(self, indices: np.ndarray, is_hit: np.ndarray,
+                 now_x: np.ndarray, now_y: np.ndarray, now_end_x: np.ndarray, now_end_y: np.ndarray,
+                 now_rotate: np.ndarray, now_floor_position: np.ndarray, now_length: np.ndarray):
+        self.indices = indices
+        self.is_hit = is_hit
+        self.now_x = now_x
+        self.now_y = now_y
+        self.now_end_x = now_end_x
+        self.now_end_y = now_end_y
+        self.now_rotate = now_rotate
+        self.now_floor_position = now_floor_position
+        self.now_length = now_length
+
+    def slice(self, start: int, stop: int) -> PhiNoteStates:
+        return PhiNoteStates(self.indices[start:stop], self.is_hit[start:stop],
+                             self.now_x[start:stop], self.now_y[start:stop],
+                             self.now_end_x[start:stop], self.now_end_y[start:stop],
+                             self.now_rotate[start:stop],
+                             self.now_floor_position[start:stop], self.now_length[start:stop])
+
+    def take(self, mask: np.ndarray) -> PhiNoteStates:
+        return PhiNoteStates(self.indices[mask], self.is_hit[mask],
+                             self.now_x[mask], self.now_y[mask],
+                             self.now_end_x[mask], self.now_end_y[mask],
+                             self.now_rotate[mask],
+                             self.now_floor_position[mask], self.now_length[mask])
+
+    @staticmethod
+    def empty() -> PhiNoteStates:
+        empty = np.zeros(0, dtype=np.float64)
 
-            return PhiDataProcessor.update_events(events, type, now_time)
+        return PhiNoteStates(np.zeros(0, dtype=np.int64), np.zeros(0, dtype=bool),
+                             empty, empty, empty, empty, empty, empty, empty)
 
 
 # 更新 Note 时返回码枚举
@@ -230,29 +782,25 @@ class NoteResultCode(IntEnum):
 
 
 class PhiLine:
-    def __init__(self, data: dict[str, Any], config: Config, res_config: ResConfig, index: int = 0):
+    def __init__(self, bpm: float, packed_events: tuple[np.ndarray, ...], notes: PhiNoteArrays,
+                 config: Config, res_config: ResConfig, index: int = 0):
         self.index = index  # 调试与 log 用
 
-        self.bpm = data["bpm"]
+        self.bpm = bpm
 
-        self.move_events = PhiDataProcessor.init_events(
-            self.bpm, data["judgeLineMoveEvents"], PhiEventTypes.MOVE)
-        self.rotate_events = PhiDataProcessor.init_events(
-            self.bpm, data["judgeLineRotateEvents"], PhiEventTypes.ROTATE)
-        self.opacity_events = PhiDataProcessor.init_events(
-            self.bpm, data["judgeLineDisappearEvents"], PhiEventTypes.OPACITY)
-        self.speed_events = PhiDataProcessor.init_events(
-            self.bpm, data["speedEvents"], PhiEventTypes.SPEED)
+        # 按 PhiEventTypes 顺序打包的事件数组，只读，供 get_event_value 与 PhiEventEvaluator 使用
+        self.packed_events: tuple[np.ndarray, ...] = packed_events
+        (self.move_events, self.rotate_events,
+         self.opacity_events, self.speed_events) = self.packed_events
 
-        self.note_groups: deque[deque[PhiNote]] = PhiDataProcessor.init_notes(
-            self.bpm, self.speed_events, data["notesAbove"], data["notesBelow"]
-        )
+        self.notes: PhiNoteArrays = notes
+        self.note_index = PhiNoteIndex(self.notes)
         # 计算此判定线的总 Note 数
-        self.note_num = len([item for row in self.note_groups for item in row])
+        self.note_num = len(self.notes)
 
         logger.info(f"已加载 {self.index} 号判定线的 Note")
         logger.info(
-            f"#notes({self.index}): {self.note_num} ({len(self.note_groups)} groups)")
+            f"#notes({self.index}): {self.note_num} ({self.notes.group_num} groups)")
 
         self.x_pos: float = 0
         self.y_pos: float = 0
@@ -260,61 +808,101 @@ class PhiLine:
         self.opacity: float = 0
         self.floor_position: float = 0
 
-        self.last_processed_note_indices: list[int] = (
-            [0] * len(self.note_groups))  # 最后处理的 Note 索引列表
+        self.note_states: PhiNoteStates = PhiNoteStates.empty()  # 本帧需要渲染的 Note 状态
         self.note_floor_position_threshold: int = 2 * config.height  # Note break 的 fp 阈值
 
         self.width = 5.76 * config.height
         self.height = 0.0075 * config.height
         self.rgb_color = res_config.colors.line_color
 
+        self.in_viewport = True  # 由 PhiChart 视口剔除设置
+
         logger.info(f"已加载 {self.index} 号判定线")
 
+    @staticmethod
+    def from_data(data: dict[str, Any], config: Config, res_config: ResConfig, index: int = 0) -> PhiLine:
+        """
+        从谱面 JSON 中的判定线数据创建判定线
+        """
+        bpm = data["bpm"]
+
+        packed_events = (
+            PhiDataProcessor.init_events(
+                bpm, data["judgeLineMoveEvents"], PhiEventTypes.MOVE),
+            PhiDataProcessor.init_events(
+                bpm, data["judgeLineRotateEvents"], PhiEventTypes.ROTATE),
+            PhiDataProcessor.init_events(
+                bpm, data["judgeLineDisappearEvents"], PhiEventTypes.OPACITY),
+            PhiDataProcessor.init_events(
+                bpm, data["speedEvents"], PhiEventTypes.SPEED),
+        )
+
+        notes = PhiDataProcessor.init_notes(
+            bpm, packed_events[PhiEventTypes.SPEED], data["notesAbove"], data["notesBelow"]
+        )
+
+        return PhiLine(bpm, packed_events, notes, config, res_config, index=index)
+
     def update(self, now_time: float):
-        self.x_pos, self.y_pos = PhiDataProcessor.update_events(
+        self.x_pos, self.y_pos = PhiDataProcessor.get_event_value(
             self.move_events, PhiEventTypes.MOVE, now_time)
-        self.rotate = PhiDataProcessor.update_events(
+        self.rotate = PhiDataProcessor.get_event_value(
             self.rotate_events, PhiEventTypes.ROTATE, now_time)
-        self.opacity = PhiDataProcessor.update_events(
+        self.opacity = PhiDataProcessor.get_event_value(
             self.opacity_events, PhiEventTypes.OPACITY, now_time)
-        self.floor_position = PhiDataProcessor.update_events(
+        self.floor_position = PhiDataProcessor.get_event_value(
             self.speed_events, PhiEventTypes.SPEED, now_time)
 
-    def update_notes(self, now_time: float, sound_manager: SoundManager):
-        for group_index, notes in enumerate(self.note_groups):
-            self.last_processed_note_indices[group_index] = -1
-
-            note_index = -1
-
-            for note in notes.copy():
-                note_index += 1
-
-                result = note.update(now_time, self, sound_manager)
-
-                if result == NoteResultCode.HIT:
-                    notes.remove(note)
-
-                    note_index -= 1  # 由于 Notes 被删除一项，index 应减 1
+    def set_state(self, x_pos: float, y_pos: float, rotate: float, opacity: float, floor_position: float):
+        """
+        直接设置判定线状态 (由 PhiEventEvaluator 批量计算得到)
+        """
+        self.x_pos = x_pos
+        self.y_pos = y_pos
+        self.rotate = rotate
+        self.opacity = opacity
+        self.floor_position = floor_position
+
+    @cached_property
+    def note_groups(self) -> list[list[PhiNote]]:
+        """
+        按组排列的 PhiNote 对象，仅在首次访问时创建
+        """
+        offsets = self.notes.group_offsets.tolist()
 
-                    continue
+        return [[self.notes.get_note(index) for index in range(start, stop)]
+                for start, stop in zip(offsets[:-1], offsets[1:])]
 
-                if result == NoteResultCode.BREAK:
-                    break
+    def update_notes(self, now_time: float):
+        """
+        向量化计算窗口内所有 Note 的状态，与逐个调用 PhiNote.update 的结果一致
+        """
+        windows = list(self.note_index.get_windows(now_time, self.floor_position,
+                                                   self.note_floor_position_threshold))
 
-                self.last_processed_note_indices[group_index] = note_index
+        self.note_states = self.notes.compute_states(
+            now_time,
+            [start for start, _ in windows], [stop - start for start, stop in windows],
+            [self.get_note_params()] * len(windows)
+        )
 
-    def render_notes(self, renderer: Renderer, notes_scale: dict[str, float]):
-        for group_index, notes in enumerate(self.note_groups):
-            last_processed_note_index = self.last_processed_note_indices[group_index]
+    def get_note_params(self) -> tuple[float, ...]:
+        """
+        返回 PhiNoteArrays.compute_states 所需的判定线参数，判定线角度的三角函数每帧只计算一次
+        """
+        radians = math.radians(self.rotate)
+        normal_radians = math.radians(self.rotate + 90)
 
-            for note_index, note in enumerate(notes):
-                if note_index > last_processed_note_index:
-                    break
+        return (self.x_pos, self.y_pos, self.rotate, self.floor_position,
+                math.cos(radians), math.sin(radians),
+                math.cos(normal_radians), math.sin(normal_radians),
+                self.note_floor_position_threshold)
 
-                note.render(renderer, notes_scale)
+    def render_notes(self, renderer: Renderer | DrawList, notes_scale: dict[str, float]):
+        self.notes.render_states(self.note_states, renderer, notes_scale)
 
-    def render(self, renderer: Renderer):
-        if self.opacity > 0:
+    def render(self, renderer: Renderer | DrawList):
+        if self.opacity > 0 and self.in_viewport:
             renderer.render_rect(x=self.x_pos, y=self.y_pos, w=self.width, h=self.height, r=self.rotate,
                                  color=(*self.rgb_color, self.opacity), anchor=(0.5, 0.5))
 
@@ -329,7 +917,7 @@ class PhiNote:
         self.is_above = data["isAbove"]
 
         self.is_visible = data["visible"]
-        self.is_hit = False  # 是否被打击 (now_time >= start_time)
+        self.is_hit = False  # 是否被打击 (now_time >= start_time)，每次 update 时重新计算
 
         self.hold_time = 0
         self.hold_speed = 1
@@ -355,14 +943,11 @@ class PhiNote:
         self.texture_names: tuple[str, str | None,
                                   str | None] = PHI_NOTE_TEXTURES[self.type]
 
-    def update(self, now_time: float, parent_line: PhiLine, sound_manager: SoundManager) -> Literal[0, 1, 2]:
-        if now_time >= self.time:
-            if not self.is_hit:
-
-                sound_manager.play_sound(self.hitsound_name)
-
-                self.is_hit = True
+    def update(self, now_time: float, parent_line: PhiLine) -> Literal[0, 1, 2]:
+        # 状态完全由 now_time 决定，打击音效由 PhiChart 统一调度
+        self.is_hit = now_time >= self.time
 
+        if self.is_hit:
             if self.type == PhiNoteTypes.HOLD and now_time <= self.end_time:  # 长条长按期间判断
                 now_hold_time = now_time - self.time
 
@@ -376,6 +961,8 @@ class PhiNote:
 
                 return NoteResultCode.HIT
         else:
+            self.now_length = self.length
+
             self.now_floor_position = ((self.floor_position - parent_line.floor_position)
                                        * self.speed)
             self.now_end_floor_position = self.now_floor_position + self.now_length
@@ -397,42 +984,37 @@ class PhiNote:
 
         return NoteResultCode.OK
 
-    def render(self, renderer: Renderer, notes_scale: dict[str, float]):
-        if self.now_floor_position < -0.0001:  # 遮罩逻辑，-0.0001 防止误差
+    def render(self, renderer: Renderer | DrawList, notes_scale: dict[str, float]):
+        PhiNote.draw(renderer, notes_scale, self.type, self.now_x, self.now_y, self.now_end_x, self.now_end_y,
+                     self.now_rotate, self.is_hit, self.is_above, self.length, self.now_length, self.now_floor_position)
+
+    @staticmethod
+    def draw(renderer: Renderer | DrawList, notes_scale: dict[str, float], type: int,
+             now_x: float, now_y: float, now_end_x: float, now_end_y: float, now_rotate: float,
+             is_hit: bool, is_above: int, length: float, now_length: float, now_floor_position: float):
+        if now_floor_position < -0.0001:  # 遮罩逻辑，-0.0001 防止误差
             return
 
         # 长条初始长度为 0 时不渲染 ( 初始长度不为 0 但当前长度为 0 仍然会正常渲染长条尾 )
-        if self.type == PhiNoteTypes.HOLD and self.length == 0:
+        if type == PhiNoteTypes.HOLD and length == 0:
             return
 
+        texture_names = PHI_NOTE_TEXTURES[type]
+
         # TODO: Note 纹理
-        if self.type == PhiNoteTypes.HOLD:  # 长条渲染
-            # 长条头
-            if not self.is_hit:
-                renderer.render_texture(self.texture_names[1], self.now_x, self.now_y,
-                                        notes_scale[self.texture_names[1]],
-                                        notes_scale[self.texture_names[1]] *
-                                        self.is_above,
-                                        self.now_rotate, anchor=(0.5, 1))
-
-            # 长条身
-            renderer.render_texture(self.texture_names[0], self.now_x, self.now_y,
-                                    notes_scale[self.texture_names[0]],
-                                    notes_scale["hold-height-scale"] *
-                                    self.now_length * self.is_above,
-                                    self.now_rotate, anchor=(0.5, 0))
-
-            # 长条尾
-            renderer.render_texture(self.texture_names[2], self.now_end_x, self.now_end_y,
-                                    notes_scale[self.texture_names[2]],
-                                    notes_scale[self.texture_names[2]] *
-                                    self.is_above,
-                                    self.now_rotate, anchor=(0.5, 0))
+        if type == PhiNoteTypes.HOLD:  # 长条渲染 (长条身、长条头、长条尾)
+            renderer.render_hold(
+                texture_names, now_x, now_y, now_end_x, now_end_y, now_rotate,
+                (notes_scale[texture_names[0]], notes_scale[texture_names[1]],
+                 notes_scale[texture_names[2]]),
+                (notes_scale["hold-height-scale"] * now_length * is_above,
+                 notes_scale[texture_names[1]] * is_above, notes_scale[texture_names[2]] * is_above),
+                not is_hit)
 
         else:  # 其他 Note 渲染
             renderer.render_texture(
-                self.texture_names[0], self.now_x, self.now_y,
-                notes_scale[self.texture_names[0]], notes_scale[self.texture_names[0]], self.now_rotate)
+                texture_names[0], now_x, now_y,
+                notes_scale[texture_names[0]], notes_scale[texture_names[0]], now_rotate)
 
 
 class PhiChart(Chart):
@@ -443,25 +1025,250 @@ class PhiChart(Chart):
 
         self.note_count = sum([line.note_num for line in self.lines])
 
+        self.event_evaluator = PhiEventEvaluator(self.lines)
+
+        # 所有判定线的 Note 拼接后的存储，每帧对所有判定线的窗口一次性向量化计算
+        self.notes = PhiNoteArrays.concatenate([line.notes for line in self.lines])
+        note_nums = [line.note_num for line in self.lines]
+        self.note_offsets: list[int] = np.cumsum(
+            [0] + note_nums[:-1]).tolist() if note_nums else []
+        self.note_states: PhiNoteStates = PhiNoteStates.empty()
+
+        # 按时间排序的打击音效表
+        order = np.argsort(self.notes.time, kind="stable")
+
+        self.hit_times: list[float] = self.notes.time[order].tolist()
+        self.hitsound_names: list[str] = [PHI_NOTE_HITSOUNDS[type]
+                                          for type in self.notes.type[order].tolist()]
+
+        self.last_update_time: float = -math.inf  # 上一次 update 的谱面时间
+
+        # 本帧所有判定线的 (x, y, rotate, opacity, floor_position) 数组
+        self.line_states: tuple[np.ndarray, ...] = tuple(
+            np.zeros(len(self.lines)) for _ in range(5))
+
+        # 视口剔除，由 set_viewport 启用
+        self.viewport: tuple[float, float] | None = None  # 屏幕半宽、半高
+        self.note_half_sizes: np.ndarray | None = None
+        self.hold_half_sizes: tuple[float, float, float] = (0, 0, 0)
+        self.culled_lines = 0  # 本帧被剔除的判定线数量
+        self.culled_notes = 0  # 本帧被剔除的 Note 数量
+
     def to_chart_time(self, now_time: float) -> float:
         return now_time - self.offset
 
+    def seek(self, now_time: float):
+        self.last_update_time = now_time
+
+    def set_viewport(self, width: float, height: float, note_sizes: dict[str, tuple[float, float]]):
+        """
+        启用视口剔除，note_sizes 为各 Note 纹理缩放后的像素尺寸 (纹理尺寸 * notes_texture_scale)
+        """
+        self.viewport = (width / 2, height / 2)
+
+        # 按 Note 类型索引的 (半宽, 半高)，长条另外记录 (半宽, 长条头高度, 长条尾高度)
+        self.note_half_sizes = np.zeros((max(PhiNoteTypes) + 1, 2), dtype=np.float64)
+
+        for type, texture_names in PHI_NOTE_TEXTURES.items():
+            if type == PhiNoteTypes.HOLD:
+                self.hold_half_sizes = (
+                    max(note_sizes[name][0] for name in texture_names) / 2,
+                    note_sizes[texture_names[1]][1], note_sizes[texture_names[2]][1])
+            else:
+                self.note_half_sizes[type] = np.array(note_sizes[texture_names[0]]) / 2
+
+    def cull_lines(self, x_pos: np.ndarray, y_pos: np.ndarray, rotate: np.ndarray, opacity: np.ndarray):
+        """
+        判定线矩形旋转后的包围盒与屏幕不相交时剔除
+        """
+        if self.viewport is None or not self.lines:
+            return
+
+        half_width, half_height = self.lines[0].width / 2, self.lines[0].height / 2
+        radians = np.radians(rotate)
+        cos, sin = np.abs(np.cos(radians)), np.abs(np.sin(radians))
+
+        in_viewport = ((np.abs(x_pos) - (cos * half_width + sin * half_height) <= self.viewport[0]) &
+                       (np.abs(y_pos) - (sin * half_width + cos * half_height) <= self.viewport[1]))
+
+        for line, line_in_viewport in zip(self.lines, in_viewport.tolist()):
+            line.in_viewport = line_in_viewport
+
+        self.culled_lines = int(np.count_nonzero((opacity > 0) & ~in_viewport))
+
+    def cull_notes(self, states: PhiNoteStates) -> PhiNoteStates:
+        """
+        Note 纹理旋转后的包围盒与屏幕不相交时剔除，长条取长条头、长条身、长条尾整体的包围盒
+        """
+        if self.viewport is None or not len(states.indices):
+            self.culled_notes = 0
+
+            return states
+
+        types = self.notes.type[states.indices]
+        is_hold = types == PhiNoteTypes.HOLD
+
+        radians = np.radians(states.now_rotate)
+        cos, sin = np.cos(radians), np.sin(radians)
+
+        # 普通 Note: 以 (now_x, now_y) 为中心的旋转矩形
+        half_sizes = self.note_half_sizes[types]
+        extent_x = np.abs(cos) * half_sizes[:, 0] + np.abs(sin) * half_sizes[:, 1]
+        extent_y = np.abs(sin) * half_sizes[:, 0] + np.abs(cos) * half_sizes[:, 1]
+        min_x, max_x = states.now_x - extent_x, states.now_x + extent_x
+        min_y, max_y = states.now_y - extent_y, states.now_y + extent_y
+
+        if is_hold.any():
+            # 长条: 长条头底部、起点、终点、长条尾顶部四个点的包围盒，再向外扩展半宽
+            hold_half_width, head_height, tail_height = self.hold_half_sizes
+            is_above = self.notes.is_above[states.indices][is_hold]
+            normal_x, normal_y = -sin[is_hold], cos[is_hold]
+
+            head_offset = np.where(states.is_hit[is_hold], 0, head_height) * is_above
+            tail_offset = tail_height * is_above
+
+            points_x = np.stack((states.now_x[is_hold] - normal_x * head_offset, states.now_x[is_hold],
+                                 states.now_end_x[is_hold], states.now_end_x[is_hold] + normal_x * tail_offset))
+            points_y = np.stack((states.now_y[is_hold] - normal_y * head_offset, states.now_y[is_hold],
+                                 states.now_end_y[is_hold], states.now_end_y[is_hold] + normal_y * tail_offset))
+
+            min_x[is_hold] = points_x.min(axis=0) - hold_half_width
+            max_x[is_hold] = points_x.max(axis=0) + hold_half_width
+            min_y[is_hold] = points_y.min(axis=0) - hold_half_width
+            max_y[is_hold] = points_y.max(axis=0) + hold_half_width
+
+        viewport_x, viewport_y = self.viewport
+        in_viewport = ((max_x >= -viewport_x) & (min_x <= viewport_x) &
+                       (max_y >= -viewport_y) & (min_y <= viewport_y))
+
+        self.culled_notes = len(in_viewport) - int(np.count_nonzero(in_viewport))
+
+        if not self.culled_notes:
+            return states
+
+        return states.take(in_viewport)
+
+    def play_hitsounds(self, now_time: float, sound_manager: SoundManager):
+        """
+        播放 (上一次 update 时间, now_time] 内的打击音效，时间倒退时视为跳转
+        """
+        if now_time > self.last_update_time:
+            for index in range(bisect.bisect_right(self.hit_times, self.last_update_time),
+                               bisect.bisect_right(self.hit_times, now_time)):
+                sound_manager.play_sound(self.hitsound_names[index])
+
+        self.last_update_time = now_time
+
     def update(self, now_time: float, sound_manager: SoundManager):
-        for line in self.lines:
-            line.update(now_time)
+        self.play_hitsounds(now_time, sound_manager)
 
-        for line in self.lines:
-            line.update_notes(now_time, sound_manager,)
+        self.line_states = self.event_evaluator.evaluate(now_time)
+        x_pos, y_pos, rotate, opacity, floor_position = self.line_states
+
+        for line, state in zip(self.lines, zip(x_pos.tolist(), y_pos.tolist(), rotate.tolist(),
+                                                 opacity.tolist(), floor_position.tolist())):
+            line.set_state(*state)
+
+        self.cull_lines(x_pos, y_pos, rotate, opacity)
+
+        self.update_notes(now_time)
+
+    def update_notes(self, now_time: float):
+        window_starts: list[int] = []
+        window_lengths: list[int] = []
+        window_params: list[tuple[float, ...]] = []
+
+        for line, note_offset in zip(self.lines, self.note_offsets):
+            windows = list(line.note_index.get_windows(now_time, line.floor_position,
+                                                       line.note_floor_position_threshold))
+
+            if not windows:
+                continue
+
+            params = line.get_note_params()
+
+            for start, stop in windows:
+                window_starts.append(note_offset + start)
+                window_lengths.append(stop - start)
+                window_params.append(params)
 
-    def render(self, renderer: Renderer, notes_scale: dict[str, float]):
+        self.note_states = self.cull_notes(self.notes.compute_states(
+            now_time, window_starts, window_lengths, window_params))
+
+    def render(self, renderer: Renderer | DrawList, notes_scale: dict[str, float]):
         for line in self.lines:
             line.render(renderer)
 
-        for line in self.lines:
-            line.render_notes(renderer, notes_scale)
+        self.notes.render_states(self.note_states, renderer, notes_scale)
+
+    def get_frame_signature(self) -> bytes:
+        """
+        本帧绘制内容的签名 (判定线位置、角度、不透明度与 Note 状态的哈希)，
+        两帧签名相同时 render 的绘制结果完全相同
+        """
+        signature = hashlib.blake2b(digest_size=16)
+
+        for array in self.line_states[:4]:  # floorPosition 只通过 Note 状态影响画面
+            signature.update(array.tobytes())
+
+        states = self.note_states
+
+        for array in (states.indices, states.is_hit, states.now_x, states.now_y,
+                      states.now_end_x, states.now_end_y, states.now_rotate,
+                      states.now_floor_position, states.now_length):
+            signature.update(array.tobytes())
+
+        return signature.digest()
+
+
+def _init_line_worker(width: int, height: int, use_numba: bool):
+    # 进程池中的子进程不会继承主进程的初始化状态
+    PhiDataConverter.init(width, height)
+    Kernels.init(use_numba)
+
+
+def _parse_line(args: tuple[dict[str, Any], Config, ResConfig, int]) -> PhiLine:
+    data, config, res_config, index = args
+
+    return PhiLine.from_data(data, config, res_config, index=index)
 
 
 class ChartParser:
+    @staticmethod
+    def parse_lines(lines: list[dict[str, Any]], config: Config, res_config: ResConfig) -> list[PhiLine]:
+        """
+        预处理所有判定线，chart_load_workers > 1 时并行处理，结果顺序与串行一致
+        """
+        workers = config.chart_load_workers or os.cpu_count() or 1
+        workers = min(workers, len(lines))
+
+        if workers <= 1:
+            return [PhiLine.from_data(line, config, res_config, index=index)
+                    for index, line in enumerate(lines)]
+
+        tasks = [(line, config, res_config, index)
+                 for index, line in enumerate(lines)]
+
+        match config.chart_load_executor:
+            case "process":
+                executor = ProcessPoolExecutor(
+                    max_workers=workers, initializer=_init_line_worker,
+                    initargs=(PhiDataConverter.width, PhiDataConverter.height, Kernels.enabled))
+            case "thread":
+                executor = ThreadPoolExecutor(max_workers=workers)
+            case _:
+                logger.warning(
+                    f"未知的 chart_load_executor: {config.chart_load_executor}，使用串行加载")
+
+                return [_parse_line(task) for task in tasks]
+
+        logger.info(
+            f"使用 {workers} 个{'进程' if config.chart_load_executor == 'process' else '线程'}加载判定线")
+
+        with executor:
+            return list(executor.map(_parse_line, tasks,
+                                     chunksize=max(1, len(tasks) // (workers * 4))))
+
     @staticmethod
     def parse(chart: dict | Any, config: Config, res_config: ResConfig) -> Chart | None:
         if isinstance(chart, dict):
@@ -482,8 +1289,7 @@ class ChartParser:
 
                 lines = chart["judgeLineList"]
 
-                line_objs = [PhiLine(line, config, res_config, index=index)
-                             for index, line in enumerate(lines)]
+                line_objs = ChartParser.parse_lines(lines, config, res_config)
 
                 logger.info(f"#lines: {len(line_objs)}")
                 logger.info(
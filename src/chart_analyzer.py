@@ -0,0 +1,311 @@
+from typing import Any
+import json
+import math
+import os
+import sys
+import time
+
+import numpy as np
+from loguru import logger
+from PIL import Image
+
+from .config import *
+from .chart import *
+from .arg_specs import *
+from .arg_parser import ArgParser
+from .chart_package import ChartPackage
+from .kernels import Kernels
+from .draw_list import DrawList, DrawCommandTypes
+
+
+# 分析时不加载纹理，Note 缩放统一取 1 (只统计绘制命令，不影响计数)
+ANALYZER_NOTES_SCALE: dict[str, float] = {
+    "note-tap": 1, "note-drag": 1, "note-flick": 1,
+    "note-hold-bottom": 1, "note-hold-middle": 1, "note-hold-top": 1,
+    "hold-height-scale": 1
+}
+
+# 帧耗时估算系数 (毫秒)，可按实际机器的渲染结果校准:
+# 每次实际绘制调用 (批次提交) 的开销、每条绘制命令 (精灵) 的开销与每帧的固定开销
+DRAW_CALL_COST_MS = 0.02
+DRAW_COMMAND_COST_MS = 0.002
+FRAME_BASE_COST_MS = 0.5
+
+HISTOGRAM_BINS = 20
+
+# 分析工具额外的命令行参数
+ANALYZER_ARG_TYPE_HINTS: dict[str, type] = {
+    "chart": str,
+    "output": str,
+    "duration": float,
+    "draw_call_cost": float,
+    "draw_command_cost": float,
+    "frame_base_cost": float
+}
+
+
+class CountingSoundManager:
+    """
+    与 SoundManager 接口相同但只统计打击音效数量
+    """
+
+    def __init__(self):
+        self.count = 0
+
+    def play_sound(self, name: str):
+        self.count += 1
+
+
+class ChartAnalyzer:
+    """
+    不进行渲染，按帧扫描谱面时间轴，统计每帧可见 Note / 判定线数量、绘制命令数与实际绘制调用数等，
+    用于预估渲染耗时和发现异常谱面
+    """
+
+    def __init__(self, chart: PhiChart, fps: int = 60, duration: float | None = None,
+                 draw_call_cost: float = DRAW_CALL_COST_MS, draw_command_cost: float = DRAW_COMMAND_COST_MS,
+                 frame_base_cost: float = FRAME_BASE_COST_MS, batch_sprites: bool = True):
+        self.chart = chart
+        self.fps = fps
+        self.duration = duration if duration is not None else ChartAnalyzer.get_duration(
+            chart)
+
+        self.draw_call_cost = draw_call_cost
+        self.draw_command_cost = draw_command_cost
+        self.frame_base_cost = frame_base_cost
+
+        self.batch_sprites = batch_sprites
+
+    @staticmethod
+    def get_duration(chart: PhiChart) -> float:
+        """
+        最后一个 Note 结束后 1 秒 (无 Note 时为 1 秒)，单位为实际时间
+        """
+        if not len(chart.notes):
+            return 1.0
+
+        return max(0.0, float(chart.notes.end_time.max()) + chart.offset) + 1
+
+    @staticmethod
+    def get_note_sizes(config: Config) -> dict[str, tuple[float, float]]:
+        """
+        与 Player 相同的 Note 纹理缩放后尺寸 (不创建 OpenGL 纹理，直接读取图片尺寸)，用于 PhiChart.set_viewport
+        """
+        note_width = config.width * PHI_NOTE_WIDTH_RATIO
+        result = {}
+
+        for names in PHI_NOTE_TEXTURES.values():
+            for name in names:
+                if name is None:
+                    continue
+
+                with Image.open(os.path.join(config.resources_dir, f"textures/notes/{name[5:]}.png")) as image:
+                    width, height = image.size
+
+                result[name] = (note_width, height * note_width / width)
+
+        return result
+
+    @staticmethod
+    def count_draw_calls(draw_list: DrawList, batch_sprites: bool) -> int:
+        """
+        估算 Renderer 绘制 draw_list 的实际绘制调用数:
+        未启用批处理时每条命令一次 (长条使用长条着色器一次绘制)，
+        启用批处理时 Note 纹理位于同一图集，只在矩形与纹理精灵交替处提交一次批次
+        """
+        if not batch_sprites:
+            return len(draw_list)
+
+        is_rect = [command[0] == DrawCommandTypes.RECT for command in draw_list.commands]
+
+        return sum(1 for previous, current in zip([None] + is_rect, is_rect) if previous != current)
+
+    @staticmethod
+    def get_histogram(values: np.ndarray, bins: int = HISTOGRAM_BINS) -> dict[str, list]:
+        if not len(values):
+            return {"edges": [], "counts": []}
+
+        if np.issubdtype(values.dtype, np.integer):  # 整数值的分组数不超过取值范围
+            bins = max(1, min(bins, int(values.max() - values.min()) + 1))
+
+        counts, edges = np.histogram(values, bins=bins)
+
+        return {"edges": edges.tolist(), "counts": counts.tolist()}
+
+    @staticmethod
+    def format_histogram(histogram: dict[str, list], width: int = 40) -> str:
+        counts, edges = histogram["counts"], histogram["edges"]
+
+        if not counts:
+            return "(无数据)"
+
+        max_count = max(counts)
+        lines = []
+
+        for count, low, high in zip(counts, edges[:-1], edges[1:]):
+            bar = "#" * (math.ceil(count / max_count * width) if count else 0)
+            lines.append(f"{low:>8.1f} - {high:<8.1f} | {bar} {count}")
+
+        return "\n".join(lines)
+
+    @staticmethod
+    def summarize(values: np.ndarray) -> dict[str, float]:
+        if not len(values):
+            return {"mean": 0.0, "peak": 0.0, "p95": 0.0}
+
+        return {
+            "mean": float(values.mean()),
+            "peak": float(values.max()),
+            "p95": float(np.percentile(values, 95))
+        }
+
+    def get_line_stats(self) -> list[dict[str, Any]]:
+        chart_duration = self.chart.to_chart_time(self.duration)
+        result = []
+
+        for line in self.chart.lines:
+            # 只统计在分析时长内开始的事件 (最后一个事件的 endTime 一般远超谱面长度)
+            events = {
+                type.name.lower(): int(np.count_nonzero(
+                    line.packed_events[type]["startTime"] <= chart_duration))
+                for type in PhiEventTypes
+            }
+
+            result.append({
+                "index": line.index,
+                "notes": line.note_num,
+                "events": events,
+                "events_per_second": sum(events.values()) / self.duration
+            })
+
+        return result
+
+    def analyze(self) -> dict[str, Any]:
+        frame_num = max(1, math.ceil(self.duration * self.fps))
+
+        visible_notes = np.zeros(frame_num, dtype=np.int64)
+        visible_lines = np.zeros(frame_num, dtype=np.int64)
+        draw_commands = np.zeros(frame_num, dtype=np.int64)
+        draw_calls = np.zeros(frame_num, dtype=np.int64)
+        hitsounds = np.zeros(frame_num, dtype=np.int64)
+        update_costs = np.zeros(frame_num, dtype=np.float64)
+
+        draw_list = DrawList()
+        sound_manager = CountingSoundManager()
+
+        self.chart.seek(-math.inf)
+
+        for frame in range(frame_num):
+            chart_time = self.chart.to_chart_time(frame / self.fps)
+
+            draw_list.clear()
+            sound_manager.count = 0
+
+            start = time.perf_counter()
+            self.chart.update(chart_time, sound_manager)
+            update_costs[frame] = (time.perf_counter() - start) * 1000
+
+            self.chart.render(draw_list, ANALYZER_NOTES_SCALE)
+
+            # 每个实际绘制的 Note 对应一条纹理或长条命令 (被遮罩、长度为 0 的长条等不产生命令)，判定线为矩形
+            visible_lines[frame] = draw_list.count(DrawCommandTypes.RECT)
+            visible_notes[frame] = len(draw_list) - visible_lines[frame]
+            draw_commands[frame] = len(draw_list)
+            draw_calls[frame] = self.count_draw_calls(draw_list, self.batch_sprites)
+            hitsounds[frame] = sound_manager.count
+
+        frame_costs = (self.frame_base_cost + update_costs +
+                       draw_calls * self.draw_call_cost + draw_commands * self.draw_command_cost)
+
+        return {
+            "fps": self.fps,
+            "duration": self.duration,
+            "frames": frame_num,
+            "lines": len(self.chart.lines),
+            "notes": self.chart.note_count,
+            "visible_notes": self.summarize(visible_notes),
+            "visible_lines": self.summarize(visible_lines),
+            "batch_sprites": self.batch_sprites,
+            "draw_commands": self.summarize(draw_commands) | {
+                "histogram": self.get_histogram(draw_commands)},
+            "draw_calls": self.summarize(draw_calls),
+            "hitsounds_per_second": self.chart.note_count / self.duration,
+            "peak_hitsounds_per_frame": int(hitsounds.max()),
+            "update_cost_ms": self.summarize(update_costs),
+            "frame_cost_ms": self.summarize(frame_costs) | {
+                "total": float(frame_costs.sum()),
+                "histogram": self.get_histogram(frame_costs)},
+            "line_stats": self.get_line_stats()
+        }
+
+
+def load_chart(path: str, config: Config, res_config: ResConfig) -> Chart | None:
+    if ChartPackage.is_package(path):
+        with ChartPackage(path) as package:
+            data = package.read_chart()
+    else:
+        with open(path, "rb") as f:
+            data = f.read()
+
+    return ChartParser.parse(json.loads(data.decode("utf-8")), config, res_config)
+
+
+if __name__ == "__main__":
+    # python -m src.chart_analyzer --chart chart.json [--output report.json] [--video_fps 60]
+    args = ArgParser.parse(sys.argv, aliases=ARG_ALIASES,
+                           type_hints=ARG_TYPE_HINTS | ANALYZER_ARG_TYPE_HINTS)
+
+    if "chart" not in args:
+        logger.error("未指定谱面文件 (--chart)")
+
+        sys.exit(1)
+
+    config = Config(**{key: value for key, value in args.items()
+                       if key in ARG_TYPE_HINTS})
+    res_config = ResConfig.from_json(
+        ArgParser.parse_from_toml(
+            os.path.join(config.resources_dir, "config.toml"),
+            True
+        ))
+
+    PhiDataConverter.init(config.width, config.height)
+    Kernels.init(config.use_numba)
+    Kernels.warmup()
+
+    chart = load_chart(args["chart"], config, res_config)
+
+    if not isinstance(chart, PhiChart):
+        logger.error("谱面解析失败")
+
+        sys.exit(1)
+
+    # 与 Player 相同启用视口剔除，统计的可见数量与绘制命令与实际渲染一致
+    if config.cull_offscreen:
+        chart.set_viewport(config.width, config.height,
+                           ChartAnalyzer.get_note_sizes(config))
+
+    analyzer = ChartAnalyzer(
+        chart, fps=config.video_fps, duration=args.get("duration"),
+        draw_call_cost=args.get("draw_call_cost", DRAW_CALL_COST_MS),
+        draw_command_cost=args.get("draw_command_cost", DRAW_COMMAND_COST_MS),
+        frame_base_cost=args.get("frame_base_cost", FRAME_BASE_COST_MS),
+        batch_sprites=config.batch_sprites)
+    report = analyzer.analyze()
+
+    print(f"帧数: {report['frames']}  判定线: {report['lines']}  Note: {report['notes']}")
+    print(f"可见 Note: 平均 {report['visible_notes']['mean']:.1f}  峰值 {report['visible_notes']['peak']:.0f}")
+    print(f"可见判定线: 平均 {report['visible_lines']['mean']:.1f}  峰值 {report['visible_lines']['peak']:.0f}")
+    print(f"绘制命令: 平均 {report['draw_commands']['mean']:.1f}  峰值 {report['draw_commands']['peak']:.0f}")
+    print(f"绘制调用: 平均 {report['draw_calls']['mean']:.1f}  峰值 {report['draw_calls']['peak']:.0f}")
+    print(f"预估帧耗时: 平均 {report['frame_cost_ms']['mean']:.3f} ms  峰值 {report['frame_cost_ms']['peak']:.3f} ms  "
+          f"总计 {report['frame_cost_ms']['total'] / 1000:.1f} s")
+    print("\n绘制命令分布:")
+    print(ChartAnalyzer.format_histogram(report["draw_commands"]["histogram"]))
+    print("\n预估帧耗时分布 (ms):")
+    print(ChartAnalyzer.format_histogram(report["frame_cost_ms"]["histogram"]))
+
+    if "output" in args:
+        with open(args["output"], "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=4)
+
+        logger.info(f"已写入分析报告: {args['output']}")
@@ -0,0 +1,141 @@
+import hashlib
+import os
+
+import numpy as np
+from loguru import logger
+
+from .config import *
+from .chart import *
+
+
+# 缓存格式版本，预处理逻辑或存储布局变化时需要递增
+CHART_CACHE_VERSION = 1
+
+# PhiNoteArrays 中需要缓存的字段 (其余字段在加载时推导)
+NOTE_FIELDS = ("time", "x_pos", "floor_position", "speed", "is_above",
+               "type", "hold_time", "hold_speed", "length")
+
+
+class ChartCache:
+    """
+    预处理后谱面的二进制缓存，以 (谱面内容哈希, 分辨率, 缓存格式版本) 为键，
+    每个谱面存储为一个未压缩的 .npz 文件 (所有判定线的数组拼接存放)
+    """
+
+    def __init__(self, cache_dir: str):
+        self.cache_dir = cache_dir
+
+    @staticmethod
+    def get_key(chart_data: bytes, config: Config) -> str:
+        chart_hash = hashlib.sha256(chart_data).hexdigest()
+
+        return f"{chart_hash}-{config.width}x{config.height}-v{CHART_CACHE_VERSION}"
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.npz")
+
+    def __contains__(self, key: str):
+        return os.path.isfile(self.get_path(key))
+
+    def load(self, key: str, config: Config, res_config: ResConfig) -> PhiChart | None:
+        path = self.get_path(key)
+
+        if not os.path.isfile(path):
+            return None
+
+        try:
+            with np.load(path, allow_pickle=False) as data:
+                if int(data["version"]) != CHART_CACHE_VERSION:
+                    logger.warning(f"谱面缓存版本不匹配: {path}")
+
+                    return None
+
+                chart = ChartCache._build_chart(data, config, res_config)
+        except Exception as e:
+            logger.warning(f"谱面缓存读取失败: {e}")
+
+            return None
+
+        logger.info(f"已从缓存加载谱面: {path}")
+
+        return chart
+
+    def save(self, key: str, chart: PhiChart):
+        if not isinstance(chart, PhiChart):
+            logger.warning("仅支持缓存官谱格式谱面")
+
+            return
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        path = self.get_path(key)
+        temp_path = f"{path}.{os.getpid()}.tmp"
+
+        arrays = {
+            "version": np.array(CHART_CACHE_VERSION, dtype=np.int64),
+            "format_version": np.array(chart.format_version, dtype=np.int64),
+            "offset": np.array(chart.offset, dtype=np.float64),
+            "bpm": np.array([line.bpm for line in chart.lines], dtype=np.float64),
+            "note_nums": np.array([line.note_num for line in chart.lines], dtype=np.int64),
+            "group_nums": np.array([line.notes.group_num for line in chart.lines], dtype=np.int64),
+            "group_offsets": chart.notes.group_offsets,
+        }
+
+        for field in NOTE_FIELDS:
+            arrays[f"notes_{field}"] = getattr(chart.notes, field)
+
+        for type in PhiEventTypes:
+            arrays[f"events_{type.name.lower()}"] = np.concatenate(
+                [line.packed_events[type] for line in chart.lines] + [np.zeros(0, dtype=PHI_EVENT_DTYPE)])
+            arrays[f"event_nums_{type.name.lower()}"] = np.array(
+                [len(line.packed_events[type]) for line in chart.lines], dtype=np.int64)
+
+        try:
+            with open(temp_path, "wb") as f:
+                np.savez(f, **arrays)
+
+            os.replace(temp_path, path)  # 写入完成后再替换，避免留下不完整的缓存
+        except Exception as e:
+            logger.warning(f"谱面缓存写入失败: {e}")
+
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+
+            return
+
+        logger.info(f"已写入谱面缓存: {path}")
+
+    @staticmethod
+    def _build_chart(data, config: Config, res_config: ResConfig) -> PhiChart:
+        bpms = data["bpm"].tolist()
+        line_num = len(bpms)
+
+        events = [data[f"events_{type.name.lower()}"] for type in PhiEventTypes]
+        event_offsets = [np.cumsum(np.concatenate(([0], data[f"event_nums_{type.name.lower()}"]))).tolist()
+                         for type in PhiEventTypes]
+
+        note_fields = {field: data[f"notes_{field}"] for field in NOTE_FIELDS}
+        note_offsets = np.cumsum(np.concatenate(([0], data["note_nums"]))).tolist()
+        group_line_offsets = np.cumsum(np.concatenate(([0], data["group_nums"]))).tolist()
+        group_offsets = data["group_offsets"]
+
+        lines = []
+
+        for index in range(line_num):
+            packed_events = tuple(
+                type_events[type_offsets[index]:type_offsets[index + 1]]
+                for type_events, type_offsets in zip(events, event_offsets))
+
+            note_start, note_stop = note_offsets[index], note_offsets[index + 1]
+            group_start, group_stop = group_line_offsets[index], group_line_offsets[index + 1]
+
+            notes = PhiNoteArrays(
+                **{field: values[note_start:note_stop] for field, values in note_fields.items()},
+                group_offsets=np.concatenate(
+                    (group_offsets[group_start:group_stop], [note_stop])) - note_start
+            )
+
+            lines.append(PhiLine(bpms[index], packed_events, notes,
+                                 config, res_config, index=index))
+
+        return PhiChart(int(data["format_version"]), float(data["offset"]), lines)
@@ -0,0 +1,116 @@
+import csv
+import io
+import os
+import zipfile
+
+from loguru import logger
+
+
+# 根据扩展名推断成员类型 (info.txt / info.csv 未指定时使用)
+CHART_EXTENSIONS = (".json",)
+MUSIC_EXTENSIONS = (".ogg", ".mp3", ".wav", ".flac")
+ILLUSTRATION_EXTENSIONS = (".png", ".jpg", ".jpeg", ".gif", ".webp", ".bmp")
+
+# 元数据中指向成员文件的字段 (小写)
+CHART_KEYS = ("chart",)
+MUSIC_KEYS = ("song", "music")
+ILLUSTRATION_KEYS = ("picture", "image", "illustration")
+
+
+class ChartPackage:
+    """
+    .pez / .zip 谱面包，打开时只读取 zip 目录和元数据，
+    谱面、音乐、曲绘在调用对应 read_* 时才从包中解压到内存
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.zip_file = zipfile.ZipFile(path, "r")
+
+        # 忽略目录项，并以小写文件名建立索引以兼容大小写不一致的元数据
+        self.members = [info.filename for info in self.zip_file.infolist()
+                        if not info.is_dir()]
+        self.member_map = {name.lower(): name for name in self.members}
+
+        self.info = self._read_info()
+
+        self.chart_name = self._find_member(CHART_KEYS, CHART_EXTENSIONS)
+        self.music_name = self._find_member(MUSIC_KEYS, MUSIC_EXTENSIONS)
+        self.illustration_name = self._find_member(
+            ILLUSTRATION_KEYS, ILLUSTRATION_EXTENSIONS)
+
+        logger.info(
+            f"已打开谱面包: {path} (谱面: {self.chart_name}, 音乐: {self.music_name}, 曲绘: {self.illustration_name})")
+
+    @staticmethod
+    def is_package(path: str) -> bool:
+        return os.path.isfile(path) and zipfile.is_zipfile(path)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    def close(self):
+        self.zip_file.close()
+
+    def read(self, name: str | None) -> bytes | None:
+        if name is None:
+            return None
+
+        return self.zip_file.read(name)
+
+    def read_chart(self) -> bytes | None:
+        return self.read(self.chart_name)
+
+    def read_music(self) -> bytes | None:
+        return self.read(self.music_name)
+
+    def read_illustration(self) -> bytes | None:
+        return self.read(self.illustration_name)
+
+    def _get_member(self, name: str) -> str | None:
+        name = name.strip().replace("\\", "/")
+
+        return self.member_map.get(name.lower())
+
+    def _read_info(self) -> dict[str, str]:
+        """
+        读取 info.txt (每行 "键: 值") 或 info.csv (首行为表头，取第一行数据)，键统一为小写
+        """
+        info: dict[str, str] = {}
+
+        if (name := self._get_member("info.txt")) is not None:
+            text = self.zip_file.read(name).decode("utf-8-sig")
+
+            for line in text.splitlines():
+                key, sep, value = line.partition(":")
+
+                if sep:
+                    info[key.strip().lower()] = value.strip()
+
+        elif (name := self._get_member("info.csv")) is not None:
+            text = self.zip_file.read(name).decode("utf-8-sig")
+
+            for row in csv.DictReader(io.StringIO(text)):
+                info = {key.strip().lower(): value.strip()
+                        for key, value in row.items() if key is not None and value is not None}
+
+                break
+
+        return info
+
+    def _find_member(self, keys: tuple[str, ...], extensions: tuple[str, ...]) -> str | None:
+        for key in keys:
+            if key in self.info:
+                if (name := self._get_member(self.info[key])) is not None:
+                    return name
+
+                logger.warning(f"谱面包元数据中的文件不存在: {self.info[key]}")
+
+        for name in self.members:
+            if name.lower().endswith(extensions):
+                return name
+
+        return None
@@ -9,14 +9,36 @@ class Config:
 
     resources_dir: str = "resources/"
 
+    package_path: str = ""  # .pez / .zip 谱面包路径，指定时不再弹出文件选择框
+
     ill_blurriness: float = 80.0
     ill_brightness: float = 0.1
 
+    cache_background: bool = True  # 曲绘与背景压暗合成为静态图层，每帧只绘制一次
+    batch_sprites: bool = True  # 合并谱面精灵为实例化绘制
+    cull_offscreen: bool = True  # 剔除屏幕外的 Note 与判定线
+    use_draw_list: bool = False  # 谱面先渲染到 DrawList，再由 Renderer.submit 提交
+    gpu_notes: bool = False  # Note 静态数据上传到 GPU，由顶点着色器计算位置
+
+    use_numba: bool = True  # 使用 Numba 编译谱面计算内核，False 时使用纯 Python 实现
+
+    chart_load_workers: int = 1  # 并行预处理判定线的进程 / 线程数，0 为 CPU 核心数，1 为串行
+    chart_load_executor: str = "process"  # "process" / "thread"
+
+    use_chart_cache: bool = True
+    chart_cache_dir: str = ".cache/charts/"
+
     render: bool = False
     video_output_path: str = "output.mp4"
     encoder: str = "libx264"
     video_fps: int = 60
     video_bitrate: str = "15000k"
+    gpu_yuv: bool = False  # 在 GPU 上转换为 yuv420p 并翻转后再读取，读取与写入的数据量减半
+    readback_buffers: int = 3  # 异步读取帧缓冲使用的像素缓冲数量，1 为每帧同步读取
+    video_write_queue: int = 8  # 写入线程的帧缓冲数量，0 为在渲染线程中同步写入 ffmpeg
+    render_workers: int = 1  # 分段并行渲染的进程数，0 为 CPU 核心数，1 为单进程渲染
+    skip_static_frames: bool = True  # 画面与上一帧相同时不重新绘制，直接重复写入上一帧
+    render_chunk_seconds: float = 0.0  # 大于 0 时按该时长分段渲染，中断后重新运行会跳过已完成的片段
 
 
 @dataclass_json
@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+from enum import IntEnum
+
+import numpy as np
+
+
+class DrawCommandTypes(IntEnum):
+    RECT = 0
+    TEXTURE = 1
+    HOLD = 2
+
+
+# 每条绘制命令: 类型、纹理 id (长条为 长条身 / 长条头 / 长条尾，未使用时为 -1)、位置、长条终点、
+# 缩放 (矩形为宽高，长条为三个部件各自的缩放)、旋转、颜色、锚点、是否显示长条头
+DRAW_COMMAND_DTYPE = np.dtype([
+    ("type", "u1"), ("textures", "i4", 3),
+    ("x", "f8"), ("y", "f8"), ("end_x", "f8"), ("end_y", "f8"),
+    ("sx", "f8", 3), ("sy", "f8", 3), ("rotation", "f8"),
+    ("color", "f8", 4), ("anchor", "f8", 2), ("show_head", "?")
+])
+
+NO_TEXTURES = (-1, -1, -1)
+NO_END = (0.0, 0.0)
+
+
+class DrawList:
+    """
+    一帧的绘制命令列表，接口与 Renderer 的 render_rect / render_texture / render_hold 相同，
+    谱面渲染到 DrawList 后由 Renderer.submit 提交，也可以转换为 DRAW_COMMAND_DTYPE 数组
+    保存、比较或传给其他进程绘制
+    """
+
+    def __init__(self):
+        # 命令以元组形式追加，字段顺序与 DRAW_COMMAND_DTYPE 一致
+        self.commands: list[tuple] = []
+
+        self.texture_names: list[str] = []
+        self.texture_ids: dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self.commands)
+
+    def clear(self):
+        """
+        清空命令，纹理名表保留 (纹理 id 在帧之间保持不变)
+        """
+        self.commands.clear()
+
+    def get_texture_id(self, texture_name: str) -> int:
+        if (texture_id := self.texture_ids.get(texture_name)) is None:
+            texture_id = self.texture_ids[texture_name] = len(
+                self.texture_names)
+            self.texture_names.append(texture_name)
+
+        return texture_id
+
+    def count(self, type: DrawCommandTypes) -> int:
+        return sum(1 for command in self.commands if command[0] == type)
+
+    def render_rect(self, x: float, y: float, w: float, h: float,
+                    r: float, color: list[float] | tuple[float] = (1, 1, 1, 1),
+                    anchor: list[float] | tuple[float] = (0.5, 0.5)):
+        self.commands.append((DrawCommandTypes.RECT, NO_TEXTURES, x, y, *NO_END,
+                              (w, 0.0, 0.0), (h, 0.0, 0.0), r, tuple(color), tuple(anchor), False))
+
+    def render_texture(self, texture_name: str, x: float, y: float, sx: float, sy: float,
+                       r: float, color: list[float] | tuple[float] = (1, 1, 1, 1),
+                       anchor: list[float] | tuple[float] = (0.5, 0.5)):
+        self.commands.append((DrawCommandTypes.TEXTURE, (self.get_texture_id(texture_name), -1, -1),
+                              x, y, *NO_END, (sx, 0.0, 0.0), (sy, 0.0, 0.0), r,
+                              tuple(color), tuple(anchor), False))
+
+    def render_hold(self, texture_names: tuple[str, str, str], x: float, y: float, end_x: float, end_y: float,
+                    r: float, sx: tuple[float, float, float], sy: tuple[float, float, float], show_head: bool,
+                    color: list[float] | tuple[float] = (1, 1, 1, 1)):
+        self.commands.append((DrawCommandTypes.HOLD, tuple(self.get_texture_id(name) for name in texture_names),
+                              x, y, end_x, end_y, tuple(sx), tuple(sy), r,
+                              tuple(color), (0.5, 0.5), bool(show_head)))
+
+    def to_array(self) -> np.ndarray:
+        return np.array(self.commands, dtype=DRAW_COMMAND_DTYPE)
+
+    @staticmethod
+    def from_array(commands: np.ndarray, texture_names: list[str]) -> DrawList:
+        draw_list = DrawList()
+
+        for texture_name in texture_names:
+            draw_list.get_texture_id(texture_name)
+
+        draw_list.commands = [
+            (type, tuple(textures), x, y, end_x, end_y, tuple(sx), tuple(sy), rotation,
+             tuple(color), tuple(anchor), show_head)
+            for type, textures, x, y, end_x, end_y, sx, sy, rotation, color, anchor, show_head
+            in commands.tolist()
+        ]
+
+        return draw_list
+
+    def save(self, path: str):
+        np.savez(path, commands=self.to_array(),
+                 texture_names=np.array(self.texture_names, dtype=str))
+
+    @staticmethod
+    def load(path: str) -> DrawList:
+        with np.load(path, allow_pickle=False) as data:
+            return DrawList.from_array(data["commands"], data["texture_names"].tolist())
+
+    def equals(self, other: DrawList, tolerance: float = 0.0) -> bool:
+        """
+        按纹理名 (而不是纹理 id) 比较两帧的绘制命令，浮点字段允许 tolerance 的误差
+        """
+        if len(self) != len(other):
+            return False
+
+        if not len(self):
+            return True
+
+        array, other_array = self.to_array(), other.to_array()
+
+        # 末尾补一个空名称，未使用的纹理 id (-1) 映射到空名称
+        names = np.array(self.texture_names + [""], dtype=str)
+        other_names = np.array(other.texture_names + [""], dtype=str)
+
+        if not (np.array_equal(array["type"], other_array["type"]) and
+                np.array_equal(array["show_head"], other_array["show_head"]) and
+                np.array_equal(names[array["textures"]], other_names[other_array["textures"]])):
+            return False
+
+        return all(np.allclose(array[field], other_array[field], rtol=0, atol=tolerance)
+                   for field in ("x", "y", "end_x", "end_y", "sx", "sy", "rotation", "color", "anchor"))
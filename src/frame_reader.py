@@ -0,0 +1,82 @@
+from collections import deque
+
+import moderngl as mgl
+
+
+class FrameReader:
+    """
+    使用多个像素缓冲对象 (PBO) 轮换异步读取帧缓冲:
+    push 只发起读取 (写入 GPU 端缓冲，不等待绘制完成)，
+    pop_into 取出最早发起的一帧，此时该帧一般已读取完成，映射时不再阻塞
+    """
+
+    def __init__(self, ctx: mgl.Context, width: int, height: int, depth: int = 3, components: int = 3):
+        self.width = width
+        self.height = height
+        self.components = components
+
+        self.frame_size = width * height * components
+
+        self.buffers = [ctx.buffer(reserve=self.frame_size)
+                        for _ in range(max(1, depth))]
+        self.next_buffer = 0
+
+        # 已发起读取、尚未取出的缓冲，按帧顺序，None 表示与上一帧相同
+        self.pending: deque[mgl.Buffer | None] = deque()
+        self.last_buffer: mgl.Buffer | None = None  # 最近取出的一帧所在的缓冲
+        self.pushed = False
+
+    @property
+    def depth(self) -> int:
+        return len(self.buffers)
+
+    def is_full(self) -> bool:
+        """
+        所有缓冲都在等待取出，下一次 push 前需要先 pop_into
+        """
+        return len(self.pending) == len(self.buffers)
+
+    def push(self, frame_buffer: mgl.Framebuffer):
+        if self.is_full():
+            raise RuntimeError("没有空闲的像素缓冲，需要先取出最早的一帧")
+
+        buffer = self.buffers[self.next_buffer]
+        self.next_buffer = (self.next_buffer + 1) % len(self.buffers)
+
+        frame_buffer.read_into(buffer, components=self.components)
+
+        self.pending.append(buffer)
+        self.pushed = True
+
+    def push_repeat(self):
+        """
+        下一帧与上一帧相同，取出时从上一帧的缓冲重新读取，不占用新的缓冲，
+        上一帧的缓冲在所有重复帧取出之前不会被 push 覆盖 (轮换前队列中至少要取出 depth 帧)
+        """
+        if self.is_full():
+            raise RuntimeError("没有空闲的像素缓冲，需要先取出最早的一帧")
+
+        if not self.pushed:
+            raise RuntimeError("没有可以重复的帧")
+
+        self.pending.append(None)
+
+    def pop_into(self, data: bytearray | memoryview):
+        """
+        将最早发起读取的一帧写入 data，data 小于一帧时只写入前 len(data) 字节
+        """
+        buffer = self.pending.popleft()
+
+        if buffer is None:
+            buffer = self.last_buffer
+        else:
+            self.last_buffer = buffer
+
+        buffer.read_into(data, size=min(len(data), self.frame_size))
+
+    def release(self):
+        for buffer in self.buffers:
+            buffer.release()
+
+        self.buffers.clear()
+        self.pending.clear()
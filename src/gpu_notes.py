@@ -0,0 +1,232 @@
+import os
+
+import moderngl as mgl
+import numpy as np
+from loguru import logger
+
+from .chart import PhiChart, PhiNoteTypes, PHI_NOTE_TEXTURES
+from .renderer import Renderer
+
+
+# 静态实例属性，与 notes.vert 中的声明对应，
+# 时间与 floorPosition 拆分为高位 (note) 与低位 (note_low) 两个 float32，见 split_float
+GPU_NOTE_INSTANCE_FORMAT = "1i 4f 3f 4f 1i 2f 2f 2f 4f/i"
+GPU_NOTE_INSTANCE_ATTRIBUTES = ["in_line", "in_note", "in_noteLow", "in_motion", "in_part",
+                                "in_size", "in_scale", "in_anchor", "in_uvRect"]
+GPU_NOTE_INSTANCE_DTYPE = np.dtype([
+    ("line", "i4"), ("note", "f4", 4), ("note_low", "f4", 3), ("motion", "f4", 4), ("part", "i4"),
+    ("size", "f4", 2), ("scale", "f4", 2), ("anchor", "f4", 2), ("uv_rect", "f4", 4)
+])
+
+# Note 部件，与 PhiNote.draw 的绘制顺序一致
+GPU_NOTE_PART_NORMAL = 0
+GPU_NOTE_PART_HOLD_HEAD = 1
+GPU_NOTE_PART_HOLD_BODY = 2
+GPU_NOTE_PART_HOLD_TAIL = 3
+
+# 各部件的纹理 (PHI_NOTE_TEXTURES 中的下标) 与锚点
+GPU_NOTE_HOLD_PARTS = (
+    (GPU_NOTE_PART_HOLD_HEAD, 1, (0.5, 1)),
+    (GPU_NOTE_PART_HOLD_BODY, 0, (0.5, 0)),
+    (GPU_NOTE_PART_HOLD_TAIL, 2, (0.5, 0)),
+)
+
+
+def split_float(values: np.ndarray | float) -> tuple[np.ndarray, np.ndarray]:
+    """
+    将 float64 拆分为 高位 + 低位 两个 float32，着色器中按 (a高 - b高) + (a低 - b低) 求差，
+    两个接近的大数 (如谱面后段的 Note 与判定线 floorPosition) 相减时不会丢失精度
+    """
+    values = np.asarray(values, dtype=np.float64)
+    high = values.astype(np.float32)
+
+    return high, (values - high).astype(np.float32)
+
+
+class GPUNoteRenderer:
+    """
+    将 Note 的静态数据一次性上传到 GPU，每帧只上传判定线状态 (O(判定线数))，
+    Note 位置、退场、遮罩与 floorPosition 阈值剔除均在顶点着色器中完成。
+    速度为负的组无法逐个剔除 (CPU 路径在超出阈值时整组中断)，仍由 CPU 计算，
+    这些 Note 与判定线一起先绘制，GPU 上的 Note 在其后一次绘制，
+    因此两者重叠时的遮挡顺序与纯 CPU 路径 (按判定线、组的顺序绘制) 不同
+    """
+
+    def __init__(self, renderer: Renderer, chart: PhiChart, notes_scale: dict[str, float]):
+        self.renderer = renderer
+        self.ctx = renderer.ctx
+        self.chart = chart
+
+        self.threshold = float(chart.lines[0].note_floor_position_threshold) if chart.lines else 0.0
+
+        notes = chart.notes
+        note_nums = [line.note_num for line in chart.lines]
+        line_indices = np.repeat(np.arange(len(chart.lines)), note_nums)
+
+        # speed >= 0 的组交给 GPU (长条的 speed 恒为 1)
+        gpu_mask = notes.speed >= 0
+
+        for line, note_offset in zip(chart.lines, chart.note_offsets):
+            offsets = line.notes.group_offsets[:-1]
+            line.note_index.cpu_groups = (
+                ~gpu_mask[note_offset + offsets]).tolist()
+
+        self.atlas_name = self._get_atlas_name()
+
+        instances = self._build_instances(
+            notes, line_indices, np.flatnonzero(gpu_mask), notes_scale)
+        self.instance_num = len(instances)
+
+        self.instance_vbo = self.ctx.buffer(
+            instances.tobytes() if len(instances) else np.zeros(1, dtype=GPU_NOTE_INSTANCE_DTYPE).tobytes())
+        self.quad_vbo = self.ctx.buffer(np.array([
+            -1.0, -1.0, 0.0, 0.0,
+            1.0, -1.0, 1.0, 0.0,
+            1.0, 1.0, 1.0, 1.0,
+            -1.0, 1.0, 0.0, 1.0
+        ], dtype="f4"))
+        self.quad_ibo = self.ctx.buffer(np.array([
+            0, 1, 2,
+            0, 3, 2
+        ], dtype="i4"))
+
+        shader_dir = os.path.join(renderer.config.resources_dir, "shaders/notes")
+
+        with open(os.path.join(shader_dir, "notes.vert")) as vert_file, open(os.path.join(shader_dir, "notes.frag")) as frag_file:
+            self.program = self.ctx.program(
+                vertex_shader=vert_file.read(), fragment_shader=frag_file.read())
+
+        self.program["screenSize"] = (renderer.config.width, renderer.config.height)
+        self.program["threshold"] = self.threshold
+        self.program["texture"] = 0
+        self.program["lineStates"] = 1
+
+        self.vao = self.ctx.vertex_array(
+            self.program,
+            [
+                (self.quad_vbo, "2f 2f", "in_pos", "in_texCoord"),
+                (self.instance_vbo, GPU_NOTE_INSTANCE_FORMAT,
+                 *GPU_NOTE_INSTANCE_ATTRIBUTES)
+            ],
+            index_buffer=self.quad_ibo
+        )
+
+        # 判定线状态纹理，每条判定线一列: 第一行为 (x, y, rotate, floorPosition 高位)，
+        # 第二行为 (floorPosition 低位, 0, 0, 0)
+        self.line_states = self.ctx.texture(
+            (max(1, len(chart.lines)), 2), 4, dtype="f4")
+        self.line_states.filter = (mgl.NEAREST, mgl.NEAREST)
+
+        logger.info(
+            f"已上传 {np.count_nonzero(gpu_mask)} 个 Note ({self.instance_num} 个实例) 到 GPU，"
+            f"{len(notes) - np.count_nonzero(gpu_mask)} 个 Note 由 CPU 计算")
+
+    def _get_atlas_name(self) -> str:
+        texture_manager = self.renderer.texture_manager
+        atlas_names = {texture_manager.get_texture_region(name)[0]
+                       for names in PHI_NOTE_TEXTURES.values() for name in names if name is not None}
+
+        if len(atlas_names) != 1:
+            raise ValueError("GPU Note 渲染要求所有 Note 纹理位于同一图集中")
+
+        return atlas_names.pop()
+
+    def _get_part_data(self, texture_name: str, notes_scale: dict[str, float],
+                       scale_y: float) -> tuple[tuple[int, int], tuple[float, float], tuple[float, ...]]:
+        texture_manager = self.renderer.texture_manager
+
+        return (texture_manager.get_texture_size(texture_name),
+                (notes_scale[texture_name], scale_y),
+                texture_manager.get_texture_region(texture_name)[1])
+
+    def _build_instances(self, notes, line_indices: np.ndarray, note_indices: np.ndarray,
+                         notes_scale: dict[str, float]) -> np.ndarray:
+        is_hold = notes.is_hold[note_indices]
+        part_counts = np.where(is_hold, len(GPU_NOTE_HOLD_PARTS), 1)
+
+        # 每个 Note 展开为 1 个 (普通 Note) 或 3 个 (长条) 实例，顺序与 CPU 绘制一致
+        instance_notes = np.repeat(note_indices, part_counts)
+        part_offsets = np.arange(len(instance_notes)) - np.repeat(
+            np.cumsum(part_counts) - part_counts, part_counts)
+        parts = np.where(np.repeat(is_hold, part_counts),
+                         part_offsets + GPU_NOTE_PART_HOLD_HEAD, GPU_NOTE_PART_NORMAL)
+
+        instances = np.zeros(len(instance_notes), dtype=GPU_NOTE_INSTANCE_DTYPE)
+        instances["line"] = line_indices[instance_notes]
+
+        time, time_low = split_float(notes.time[instance_notes])
+        end_time, end_time_low = split_float(notes.end_time[instance_notes])
+        floor_position, floor_position_low = split_float(
+            notes.floor_position[instance_notes])
+
+        instances["note"] = np.stack([
+            time, end_time, notes.x_pos[instance_notes], floor_position
+        ], axis=1)
+        instances["note_low"] = np.stack(
+            [time_low, end_time_low, floor_position_low], axis=1)
+        instances["motion"] = np.stack([
+            notes.speed[instance_notes], notes.is_above[instance_notes],
+            notes.hold_speed[instance_notes], notes.length[instance_notes]
+        ], axis=1)
+        instances["part"] = parts
+
+        types = notes.type[instance_notes]
+
+        for type, texture_names in PHI_NOTE_TEXTURES.items():
+            if type == PhiNoteTypes.HOLD:
+                for part, texture_index, anchor in GPU_NOTE_HOLD_PARTS:
+                    texture_name = texture_names[texture_index]
+                    scale_y = (notes_scale["hold-height-scale"] if part == GPU_NOTE_PART_HOLD_BODY
+                               else notes_scale[texture_name])
+                    mask = parts == part
+
+                    (instances["size"][mask], instances["scale"][mask],
+                     instances["uv_rect"][mask]) = self._get_part_data(texture_name, notes_scale, scale_y)
+                    instances["anchor"][mask] = anchor
+            else:
+                mask = types == type
+
+                (instances["size"][mask], instances["scale"][mask],
+                 instances["uv_rect"][mask]) = self._get_part_data(
+                    texture_names[0], notes_scale, notes_scale[texture_names[0]])
+                instances["anchor"][mask] = (0.5, 0.5)
+
+        return instances
+
+    def render(self, now_time: float):
+        if not self.instance_num:
+            return
+
+        x_pos, y_pos, rotate, _, floor_position = self.chart.line_states
+
+        floor_position, floor_position_low = split_float(floor_position)
+        zeros = np.zeros_like(floor_position)
+
+        self.line_states.write(np.concatenate((
+            np.stack((x_pos, y_pos, rotate, floor_position), axis=1),
+            np.stack((floor_position_low, zeros, zeros, zeros), axis=1)
+        )).astype("f4").tobytes())
+
+        now_time, now_time_low = split_float(now_time)
+
+        self.program["nowTime"] = float(now_time)
+        self.program["nowTimeLow"] = float(now_time_low)
+
+        self.renderer.texture_manager.use_texture(self.atlas_name, location=0)
+        self.line_states.use(location=1)
+
+        # 与其他绘制路径相同使用 TRIANGLE_STRIP，保证混合结果一致
+        self.vao.render(mgl.TRIANGLE_STRIP, instances=self.instance_num)
+
+        self.renderer.stats.record_draw(self.program.glo)
+
+    def release(self):
+        for line in self.chart.lines:
+            line.note_index.cpu_groups = [True] * len(line.note_index.cpu_groups)
+
+        self.vao.release()
+        self.program.release()
+        self.line_states.release()
+        self.instance_vbo.release()
+        self.quad_ibo.release()
+        self.quad_vbo.release()
@@ -22,6 +22,9 @@ PHI_NOTE_HITSOUNDS = {
 
 
 class HitSoundMixer:
+    # 已解码的打击音效: (资源目录, 采样率) -> {音效名: 音频}，批量渲染时在任务之间复用
+    hitsound_cache: dict[tuple[str, int], dict[str, np.ndarray]] = {}
+
     @staticmethod
     def to_stereo(audio: np.array, target_channels: int = 2):
         """确保音频为立体声格式 (channels, samples)"""
@@ -35,28 +38,23 @@ class HitSoundMixer:
             return audio[:2, :]
 
     @staticmethod
-    def mix(music: str | bytes, chart: PhiChart | Chart, config: Config, target_sr=48000) -> tuple[np.ndarray, float | int]:
-        logger.info("正在加载音乐，该过程耗时可能较长...")
+    def load_hitsounds(resources_dir: str, target_sr: int) -> dict[str, np.ndarray]:
+        cache_key = (os.path.abspath(resources_dir), target_sr)
 
-        mus = BytesIO(music) if isinstance(music, bytes) else music
-        audio, sr = librosa.load(mus, sr=target_sr, mono=False)
-
-        logger.info("加载完成")
-
-        if len(audio.shape) == 1:
-            audio = HitSoundMixer.to_stereo(audio)
+        if cache_key in HitSoundMixer.hitsound_cache:
+            return HitSoundMixer.hitsound_cache[cache_key]
 
         hitsounds = {
             "tap": librosa.load(
-                os.path.join(config.resources_dir, "sounds/tap.ogg"),
+                os.path.join(resources_dir, "sounds/tap.ogg"),
                 sr=target_sr, mono=False
             )[0],
             "drag": librosa.load(
-                os.path.join(config.resources_dir, "sounds/drag.ogg"),
+                os.path.join(resources_dir, "sounds/drag.ogg"),
                 sr=target_sr, mono=False
             )[0],
             "flick": librosa.load(
-                os.path.join(config.resources_dir, "sounds/flick.ogg"),
+                os.path.join(resources_dir, "sounds/flick.ogg"),
                 sr=target_sr, mono=False
             )[0]
         }
@@ -67,25 +65,42 @@ class HitSoundMixer:
             if len(sound.shape) == 1:
                 hitsounds[key] = HitSoundMixer.to_stereo(sound)
 
+        HitSoundMixer.hitsound_cache[cache_key] = hitsounds
+
+        return hitsounds
+
+    @staticmethod
+    def mix(music: str | bytes, chart: PhiChart | Chart, config: Config, target_sr=48000) -> tuple[np.ndarray, float | int]:
+        logger.info("正在加载音乐，该过程耗时可能较长...")
+
+        mus = BytesIO(music) if isinstance(music, bytes) else music
+        audio, sr = librosa.load(mus, sr=target_sr, mono=False)
+
+        logger.info("加载完成")
+
+        if len(audio.shape) == 1:
+            audio = HitSoundMixer.to_stereo(audio)
+
+        hitsounds = HitSoundMixer.load_hitsounds(config.resources_dir, target_sr)
+
         hitsound_audio = np.zeros_like(audio, dtype=np.float32)
 
         note_count = chart.note_count
 
         with tqdm.tqdm(total=note_count, unit="Notes", desc="合成音频...") as bar:
             for line in chart.lines:
-                for speed in line.note_groups:
-                    for note in speed:
-                        start_sample = int((note.time + chart.offset) * sr)
-                        end_sample = min(
-                            audio.shape[-1], start_sample +
-                            hitsounds[PHI_NOTE_HITSOUNDS[note.type]].shape[-1])
-
-                        if (0 <= start_sample < hitsound_audio.shape[-1] and
-                                start_sample < end_sample):
-                            hitsound_audio[:, start_sample:end_sample] += (
-                                hitsounds[PHI_NOTE_HITSOUNDS[note.type]][:, 0:end_sample-start_sample])
-
-                            bar.update()
+                for note_time, note_type in zip(line.notes.time.tolist(), line.notes.type.tolist()):
+                    start_sample = int((note_time + chart.offset) * sr)
+                    end_sample = min(
+                        audio.shape[-1], start_sample +
+                        hitsounds[PHI_NOTE_HITSOUNDS[note_type]].shape[-1])
+
+                    if (0 <= start_sample < hitsound_audio.shape[-1] and
+                            start_sample < end_sample):
+                        hitsound_audio[:, start_sample:end_sample] += (
+                            hitsounds[PHI_NOTE_HITSOUNDS[note_type]][:, 0:end_sample-start_sample])
+
+                        bar.update()
 
         hitsound_audio = hitsound_audio.clip(-0.5, 0.5)
 
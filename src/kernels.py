@@ -0,0 +1,206 @@
+import numpy as np
+from loguru import logger
+
+
+# 以下函数以 Numba 可编译的形式编写 (仅使用标量循环与 NumPy 数组下标)，
+# 由 Kernels.init 使用 numba.njit(cache=True, nogil=True) 编译，未启用时使用 chart.py 中的纯 Python / NumPy 实现
+
+def _evaluate_events(now_time: float, start_time: np.ndarray, end_time: np.ndarray,
+                     start: np.ndarray, end: np.ndarray, start2: np.ndarray, end2: np.ndarray,
+                     first_indices: np.ndarray, last_indices: np.ndarray,
+                     value: np.ndarray, value2: np.ndarray):
+    for segment in range(len(first_indices)):
+        # 第一个 endTime > now_time 的事件，找不到时取该段最后一个事件
+        low = first_indices[segment]
+        high = last_indices[segment]
+
+        while low < high:
+            mid = (low + high) >> 1
+
+            if end_time[mid] <= now_time:
+                low = mid + 1
+            else:
+                high = mid
+
+        event_time = end_time[low] - start_time[low]
+        progress = ((now_time - start_time[low]) / event_time) if event_time != 0 else 1.0
+
+        value[segment] = start[low] + ((end[low] - start[low]) * progress)
+        value2[segment] = start2[low] + ((end2[low] - start2[low]) * progress)
+
+
+def _integrate_floor_positions(start_time: np.ndarray, end_time: np.ndarray, value: np.ndarray,
+                               start: np.ndarray, end: np.ndarray):
+    floor_position = 0.0
+
+    for index in range(len(value)):
+        start[index] = floor_position
+
+        floor_position = floor_position + \
+            value[index] * (end_time[index] - start_time[index])
+
+        end[index] = floor_position
+
+
+def _get_floor_positions(times: np.ndarray, start_time: np.ndarray, end_time: np.ndarray,
+                         start: np.ndarray, end: np.ndarray, result: np.ndarray):
+    for index in range(len(times)):
+        time = times[index]
+
+        left, right = 0, len(start_time) - 1
+        floor_position = 0.0
+
+        while left <= right:
+            mid = left + (right - left) // 2
+
+            if start_time[mid] <= time <= end_time[mid]:
+                progress = ((time - start_time[mid]) /
+                            (end_time[mid] - start_time[mid]))
+                floor_position = start[mid] + ((end[mid] - start[mid]) * progress)
+
+                break
+
+            elif time < start_time[mid]:
+                right = mid - 1
+
+            else:
+                left = mid + 1
+
+        result[index] = floor_position
+
+
+def _compute_note_states(now_time: float, window_starts: np.ndarray, window_lengths: np.ndarray,
+                         window_params: np.ndarray,
+                         time: np.ndarray, x_pos: np.ndarray, floor_position: np.ndarray,
+                         speed: np.ndarray, is_above: np.ndarray, is_hold: np.ndarray,
+                         end_time: np.ndarray, hold_speed: np.ndarray, length: np.ndarray,
+                         indices: np.ndarray, is_hit: np.ndarray,
+                         now_x: np.ndarray, now_y: np.ndarray, now_end_x: np.ndarray, now_end_y: np.ndarray,
+                         now_rotate: np.ndarray, now_floor_position: np.ndarray, now_length: np.ndarray) -> int:
+    count = 0
+
+    for window in range(len(window_starts)):
+        line_x = window_params[window, 0]
+        line_y = window_params[window, 1]
+        line_rotate = window_params[window, 2]
+        line_floor_position = window_params[window, 3]
+        cos = window_params[window, 4]
+        sin = window_params[window, 5]
+        normal_cos = window_params[window, 6]
+        normal_sin = window_params[window, 7]
+        threshold = window_params[window, 8]
+
+        for index in range(window_starts[window], window_starts[window] + window_lengths[window]):
+            note_is_hit = now_time >= time[index]
+            is_holding = note_is_hit and is_hold[index] and now_time <= end_time[index]
+
+            if note_is_hit and not is_holding:  # 已退场
+                continue
+
+            if is_holding:
+                note_length = length[index] - \
+                    (now_time - time[index]) * hold_speed[index]
+                note_floor_position = 0.0
+                note_end_floor_position = note_length
+            else:
+                note_length = length[index]
+                note_floor_position = (
+                    floor_position[index] - line_floor_position) * speed[index]
+                note_end_floor_position = note_floor_position + note_length
+
+            if note_floor_position > threshold:
+                break
+
+            real_floor_position = note_floor_position * is_above[index]
+            real_end_floor_position = note_end_floor_position * is_above[index]
+
+            base_x = line_x + cos * x_pos[index]
+            base_y = line_y + sin * x_pos[index]
+
+            indices[count] = index
+            is_hit[count] = note_is_hit
+            now_x[count] = base_x + normal_cos * real_floor_position
+            now_y[count] = base_y + normal_sin * real_floor_position
+            now_end_x[count] = base_x + normal_cos * real_end_floor_position
+            now_end_y[count] = base_y + normal_sin * real_end_floor_position
+            now_rotate[count] = line_rotate
+            now_floor_position[count] = note_floor_position
+            now_length[count] = note_length
+
+            count += 1
+
+    return count
+
+
+class Kernels:
+    """
+    谱面计算热点的 Numba 编译版本，编译结果缓存在磁盘上 (cache=True)，
+    执行时释放 GIL (nogil=True) 以便线程池并行加载判定线，
+    一般在 Player.__init__ 中根据 Config.use_numba 初始化
+    """
+    enabled: bool = False
+
+    evaluate_events = staticmethod(_evaluate_events)
+    integrate_floor_positions = staticmethod(_integrate_floor_positions)
+    get_floor_positions = staticmethod(_get_floor_positions)
+    compute_note_states = staticmethod(_compute_note_states)
+
+    @staticmethod
+    def init(use_numba: bool = True):
+        Kernels.enabled = False
+
+        if not use_numba:
+            logger.info("未启用 Numba，使用纯 Python 实现")
+
+            return
+
+        try:
+            import numba
+        except ImportError as e:
+            logger.warning(f"Numba 导入失败，使用纯 Python 实现: {e}")
+
+            return
+
+        Kernels.evaluate_events = staticmethod(
+            numba.njit(cache=True, nogil=True)(_evaluate_events))
+        Kernels.integrate_floor_positions = staticmethod(
+            numba.njit(cache=True, nogil=True)(_integrate_floor_positions))
+        Kernels.get_floor_positions = staticmethod(
+            numba.njit(cache=True, nogil=True)(_get_floor_positions))
+        Kernels.compute_note_states = staticmethod(
+            numba.njit(cache=True, nogil=True)(_compute_note_states))
+
+        Kernels.enabled = True
+
+    @staticmethod
+    def warmup():
+        """
+        以实际使用的参数类型调用一次所有内核，触发编译 (或从磁盘缓存加载)
+        """
+        if not Kernels.enabled:
+            return
+
+        floats = np.zeros(1, dtype=np.float64)
+        ints = np.zeros(1, dtype=np.int64)
+
+        Kernels.evaluate_events(0.0, floats, floats, floats, floats, floats, floats,
+                                ints, ints, floats.copy(), floats.copy())
+        Kernels.integrate_floor_positions(
+            floats, floats, floats, floats.copy(), floats.copy())
+        Kernels.get_floor_positions(
+            floats, floats, np.ones(1, dtype=np.float64), floats, floats, floats.copy())
+        Kernels.compute_note_states(0.0, ints, ints, np.zeros((1, 9), dtype=np.float64),
+                                    floats, floats, floats, floats,
+                                    np.zeros(1, dtype=np.int8), np.zeros(1, dtype=bool),
+                                    floats, floats, floats,
+                                    ints.copy(), np.zeros(1, dtype=bool),
+                                    floats.copy(), floats.copy(), floats.copy(), floats.copy(),
+                                    floats.copy(), floats.copy(), floats.copy())
+
+        logger.info("已预编译谱面计算内核")
+
+
+if __name__ == "__main__":
+    # 预先编译并写入磁盘缓存: python -m src.kernels
+    Kernels.init(True)
+    Kernels.warmup()
@@ -8,6 +8,11 @@ from .config import *
 from .player import *
 from .video_renderer import *
 from .hitsound_mixer import *
+from .chart_cache import ChartCache
+from .chart_package import ChartPackage
+from .frame_reader import FrameReader
+from .yuv_converter import YUVConverter
+from .segment_renderer import SegmentRenderer
 
 
 class PyPR:
@@ -40,32 +45,98 @@ class PyPR:
         # 初始化播放器
         self.player = Player(self.config, self.res_config, self.renderer)
 
+        self.chart_cache: ChartCache | None = (
+            ChartCache(self.config.chart_cache_dir) if self.config.use_chart_cache else None)
+
         self.video_renderer: VideoRenderer = None
 
+        # 导入的谱面与曲绘原始数据，分段渲染时传给子进程
+        self.chart_data: bytes | None = None
+        self.illustration: str | bytes | BytesIO | None = None
+
         if self.config.render:
             self.video_renderer = VideoRenderer(self.config)
 
         # 初始化变量
         self.running = True
 
+    def reset(self):
+        """
+        清除已导入的谱面、音乐与曲绘，用于在同一个 PyPR 中依次渲染多个谱面
+        """
+        self.player.reset()
+
+        self.chart_data = None
+        self.illustration = None
+
+        # 谱面缓存设置可能在两次渲染之间改变 (如批量渲染中的任务配置)
+        self.chart_cache = (
+            ChartCache(self.config.chart_cache_dir) if self.config.use_chart_cache else None)
+
     def import_chart_by_path(self, path: str):
         if not path:
             logger.error("未选择谱面文件")
 
             sys.exit()
 
-        with open(path, "r", encoding="utf-8") as f:
-            try:
-                self.player.load_chart(json.load(f))
-            except Exception as e:
-                import traceback
+        with open(path, "rb") as f:
+            self.import_chart(f.read())
+
+    def import_package_by_path(self, path: str):
+        if not path:
+            logger.error("未选择谱面包")
 
-                logger.error(f"谱面导入失败: {e}")
+            sys.exit()
 
-                logger.error(traceback.format_exc())
+        try:
+            package = ChartPackage(path)
+        except Exception as e:
+            logger.error(f"谱面包打开失败: {e}")
+
+            sys.exit()
+
+        with package:
+            if package.chart_name is None:
+                logger.error("谱面包中未找到谱面文件")
 
                 sys.exit()
 
+            self.import_chart(package.read_chart())
+            self.import_music(package.read_music())
+            self.import_illustration(package.read_illustration())
+
+    def import_chart(self, data: bytes):
+        self.chart_data = data
+
+        try:
+            cache_key: str | None = None
+
+            # 未启用缓存时不计算谱面哈希
+            if self.chart_cache is not None:
+                cache_key = ChartCache.get_key(data, self.config)
+
+                if cache_key in self.chart_cache:
+                    chart = self.chart_cache.load(
+                        cache_key, self.config, self.res_config)
+
+                    if chart is not None:
+                        self.player.load_chart(chart)
+
+                        return
+
+            self.player.load_chart(json.loads(data.decode("utf-8")))
+
+            if cache_key is not None and self.player.loaded_chart:
+                self.chart_cache.save(cache_key, self.player.chart)
+        except Exception as e:
+            import traceback
+
+            logger.error(f"谱面导入失败: {e}")
+
+            logger.error(traceback.format_exc())
+
+            sys.exit()
+
     def import_music(self, music: str | bytes):
         self.player.load_music(music)
 
@@ -79,6 +150,8 @@ class PyPR:
             HitSoundMixer.mix_as_file(music, self.player.chart, self.config)
 
     def import_illustration(self, illustration: str | bytes | BytesIO):
+        self.illustration = illustration
+
         self.player.load_illustration(illustration)
 
     def _handle_events(self, events: list[pygame.Event]):
@@ -93,27 +166,116 @@ class PyPR:
 
             return
 
-        self.renderer.create_frame_buffer()
-        self.renderer.frame_buffer.use()
+        workers = self.config.render_workers or os.cpu_count() or 1
+        segment_frames = round(self.config.render_chunk_seconds * self.config.video_fps)
+
+        # 多进程渲染或分段渲染 (可中断后继续) 时由 SegmentRenderer 渲染并拼接
+        if (workers > 1 or segment_frames > 0) and self.chart_data is not None:
+            SegmentRenderer.render(
+                self.config, self.chart_data, self.illustration, self.video_renderer.total_frame,
+                self.video_renderer.video_output_path, HITSOUND_AUDIO_PATH, workers, segment_frames)
+
+            return
 
         self.video_renderer.create_popen()
 
-        bar = self.video_renderer.get_progress_bar()
-        time = 0
+        with self.video_renderer.get_progress_bar() as bar:
+            self.render_frames(0, self.video_renderer.total_frame, bar)
 
-        pbo = bytearray(self.config.width * self.config.height * 3)
+        self.video_renderer.close()
 
-        for _ in bar:
-            self.renderer.clear()
+    def render_frames(self, start_frame: int, end_frame: int, bar: tqdm.tqdm | None = None):
+        """
+        渲染 [start_frame, end_frame) 的画面并写入已启动的 ffmpeg，
+        第 k 帧的时间为 k * frame_time，因此从任意帧开始渲染的结果都相同
+        """
+        if self.renderer.frame_buffer is None:
+            self.renderer.create_frame_buffer()
 
-            self.player.update(time=time)
+        self.renderer.frame_buffer.use()
 
-            self.renderer.frame_buffer.read_into(pbo)
-            self.video_renderer.write_frame(pbo)
+        frame_time = self.video_renderer.frame_time
 
-            time += self.video_renderer.frame_time
+        if start_frame > 0:  # 跳过之前的打击音效
+            self.player.seek(start_frame * frame_time)
 
-        self.video_renderer.close()
+        yuv_converter = YUVConverter(self.renderer) if self.config.gpu_yuv else None
+
+        # 发起第 k 帧的读取后只取出第 k - N + 1 帧，其余帧的读取在后续帧绘制时完成
+        if yuv_converter is not None:
+            frame_reader = FrameReader(
+                self.renderer.ctx, yuv_converter.width, yuv_converter.rows,
+                self.config.readback_buffers, components=1)
+        else:
+            frame_reader = FrameReader(
+                self.renderer.ctx, self.config.width, self.config.height, self.config.readback_buffers)
+
+        previous_signature: bytes | None = None
+        static_frames = 0
+
+        try:
+            for frame in range(start_frame, end_frame):
+                self.player.update_state(time=frame * frame_time)
+
+                # 画面与上一帧相同时跳过绘制与读取，直接重复写入上一帧
+                signature = self.player.get_frame_signature() if self.config.skip_static_frames else None
+
+                if signature is not None and signature == previous_signature:
+                    frame_reader.push_repeat()
+
+                    if frame_reader.is_full():
+                        self._write_frame(frame_reader)
+
+                    static_frames += 1
+
+                    if bar is not None:
+                        bar.update()
+
+                    continue
+
+                previous_signature = signature
+
+                self.renderer.new_frame()
+                self.renderer.clear()
+
+                self.player.render()
+
+                if yuv_converter is not None:
+                    yuv_converter.convert(
+                        self.renderer.frame_buffer.color_attachments[0])
+                    frame_reader.push(yuv_converter.frame_buffer)
+                else:
+                    frame_reader.push(self.renderer.frame_buffer)
+
+                if frame_reader.is_full():
+                    self._write_frame(frame_reader)
+
+                if bar is not None:
+                    bar.update()
+
+            while frame_reader.pending:
+                self._write_frame(frame_reader)
+
+        except BaseException:
+            # 写入失败或渲染中断时结束 ffmpeg 与写入线程，避免遗留进程
+            self.video_renderer.abort()
+
+            raise
+        finally:
+            frame_reader.release()
+
+            if yuv_converter is not None:
+                yuv_converter.release()
+
+        if static_frames:
+            logger.info(f"{static_frames} 帧画面与上一帧相同，已直接重复写入")
+
+    def _write_frame(self, frame_reader: FrameReader):
+        # 直接读取到写入线程的帧缓冲中，不额外复制
+        frame = self.video_renderer.get_buffer()
+        frame_reader.pop_into(frame)
+
+        self.video_renderer.submit_frame(frame)
 
     def main_loop(self):
         if self.config.render:
@@ -133,6 +295,7 @@ class PyPR:
                 break
 
             # 渲染画面
+            self.renderer.new_frame()
             self.renderer.clear()
 
             self.player.update()
@@ -149,31 +312,39 @@ if __name__ == "__main__":
 
     app = PyPR(args=args)
 
-    root = Tk()
-    root.withdraw()
-    root.attributes("-topmost", True)
-
-    app.import_chart_by_path(askopenfilename(
-        title="请选择谱面文件",
-        filetypes=(
-            ("JSON 文件", "*.json"),
-            ("所有文件", "*.*"),
-        )))
-
-    app.import_music(askopenfilename(
-        title="请选择音乐文件",
-        filetypes=(
-            ("音频文件", "*.mp3 *.ogg *.wav"),
-            ("所有文件", "*.*"),
-        )))
-
-    app.import_illustration(askopenfilename(
-        title="请选择曲绘文件",
-        filetypes=(
-            ("音频文件", "*.png *.jpg *.jpeg *.gif"),
-            ("所有文件", "*.*"),
-        )))
-
-    root.destroy()
+    if app.config.package_path:
+        app.import_package_by_path(app.config.package_path)
+    else:
+        root = Tk()
+        root.withdraw()
+        root.attributes("-topmost", True)
+
+        chart_path = askopenfilename(
+            title="请选择谱面文件或谱面包",
+            filetypes=(
+                ("谱面文件", "*.json *.pez *.zip"),
+                ("所有文件", "*.*"),
+            ))
+
+        if ChartPackage.is_package(chart_path):
+            app.import_package_by_path(chart_path)
+        else:
+            app.import_chart_by_path(chart_path)
+
+            app.import_music(askopenfilename(
+                title="请选择音乐文件",
+                filetypes=(
+                    ("音频文件", "*.mp3 *.ogg *.wav"),
+                    ("所有文件", "*.*"),
+                )))
+
+            app.import_illustration(askopenfilename(
+                title="请选择曲绘文件",
+                filetypes=(
+                    ("音频文件", "*.png *.jpg *.jpeg *.gif"),
+                    ("所有文件", "*.*"),
+                )))
+
+        root.destroy()
 
     app.main_loop()
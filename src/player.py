@@ -11,6 +11,9 @@ from .chart import *
 from .timer import *
 from .dxsmixer import *
 from .texture import TextureCreateTypes
+from .kernels import Kernels
+from .gpu_notes import GPUNoteRenderer
+from .draw_list import DrawList
 from .sound_manager import *
 
 
@@ -24,12 +27,19 @@ class Player:
 
         self.chart: Chart = None
         self.loaded_chart = False
+        self.chart_time = 0.0  # update_state 计算的当前谱面时间
+
+        self.gpu_notes: GPUNoteRenderer | None = None
+
+        # 上一帧谱面的绘制命令 (仅 Config.use_draw_list 启用时记录)
+        self.draw_list = DrawList()
 
         self.music: musicCls = musicCls()
         self.loaded_music = False
         self.music_length = 0
 
         self.loaded_illustration = False
+        self.illustration_version = 0  # 每次加载曲绘后递增，用于判断背景图层是否需要重新绘制
 
         self.sound_manager = SoundManager()
 
@@ -40,6 +50,9 @@ class Player:
 
         PhiDataConverter.init(config.width, config.height)
 
+        Kernels.init(config.use_numba)
+        Kernels.warmup()
+
         self._load_note_sounds()
         logger.info("已加载 Note 音效")
 
@@ -47,8 +60,12 @@ class Player:
         self.notes_texture_scale = self._get_note_scale()
         logger.info("已加载 Note 纹理")
 
-    def load_chart(self, chart: dict | Any):
-        self.chart = ChartParser.parse(chart, self.config, self.res_config)
+    def load_chart(self, chart: dict | Chart | Any):
+        if isinstance(chart, Chart):  # 已解析的谱面 (如从缓存加载)
+            self.chart = chart
+        else:
+            self.chart = ChartParser.parse(
+                chart, self.config, self.res_config)
 
         if self.chart is None:
             logger.error("谱面解析失败")
@@ -56,6 +73,24 @@ class Player:
 
         self.loaded_chart = True
 
+        if self.gpu_notes is not None:
+            self.gpu_notes.release()
+            self.gpu_notes = None
+
+        if self.config.cull_offscreen and isinstance(self.chart, PhiChart):
+            self.chart.set_viewport(self.width, self.height, {
+                name: tuple(size * self.notes_texture_scale[name] for size in
+                            self.renderer.texture_manager.get_texture_size(name, default=(1, 1)))
+                for names in PHI_NOTE_TEXTURES.values() for name in names if name is not None
+            })
+
+        if self.config.gpu_notes:
+            if isinstance(self.chart, PhiChart):
+                self.gpu_notes = GPUNoteRenderer(
+                    self.renderer, self.chart, self.notes_texture_scale)
+            else:
+                logger.warning("GPU Note 渲染仅支持官谱格式谱面")
+
         logger.info("谱面加载成功")
 
     def load_music(self, music: str | bytes):
@@ -82,7 +117,25 @@ class Player:
     def unload_music(self):
         self.music.unload()
         self.music_length = 0
-        self.load_music = False
+        self.loaded_music = False
+
+    def reset(self):
+        """
+        清除谱面、音乐与曲绘，保留 OpenGL 资源、Note 纹理与音效 (批量渲染时在任务之间调用)
+        """
+        if self.gpu_notes is not None:
+            self.gpu_notes.release()
+            self.gpu_notes = None
+
+        self.chart = None
+        self.loaded_chart = False
+
+        self.unload_music()
+
+        self.loaded_illustration = False
+
+        self.draw_list.clear()
+        self.timer.reset()
 
     def load_illustration(self, illustration: str | bytes | BytesIO):
         if not illustration:
@@ -110,6 +163,8 @@ class Player:
 
                 self.renderer.texture_manager.create_texture(
                     self.renderer.ctx, "illustration", image, TextureCreateTypes.IMAGE)
+
+                self.illustration_version += 1
         except Exception as e:
             import traceback
 
@@ -123,6 +178,21 @@ class Player:
         logger.info("曲绘加载成功")
 
     def render_illustration(self):
+        if not self.config.cache_background:
+            self.draw_background()
+
+            return
+
+        # 背景只在曲绘或压暗设置变化时重新绘制到图层，之后每帧一次合成
+        layer = self.renderer.get_layer("background")
+        key = (self.illustration_version, self.config.ill_brightness)
+
+        if not layer.is_valid(key):
+            self.renderer.bake_layer(layer, self.draw_background, key)
+
+        self.renderer.render_layer(layer)
+
+    def draw_background(self):
         self.renderer.render_texture("illustration", x=0, y=0, sx=1, sy=1,
                                      r=0, color=(1, 1, 1, 1), anchor=(0.5, 0.5))
 
@@ -143,33 +213,17 @@ class Player:
             "hitsound-drag", os.path.join(self.config.resources_dir, "sounds/drag.ogg"))
 
     def _load_note_textures(self):
-        self.renderer.texture_manager.create_texture(
-            self.renderer.ctx, "note-tap", os.path.join(
-                self.config.resources_dir, "textures/notes/tap.png"), TextureCreateTypes.PATH
-        )
-        self.renderer.texture_manager.create_texture(
-            self.renderer.ctx, "note-drag", os.path.join(
-                self.config.resources_dir, "textures/notes/drag.png"), TextureCreateTypes.PATH
-        )
-        self.renderer.texture_manager.create_texture(
-            self.renderer.ctx, "note-flick", os.path.join(
-                self.config.resources_dir, "textures/notes/flick.png"), TextureCreateTypes.PATH
-        )
-        self.renderer.texture_manager.create_texture(
-            self.renderer.ctx, "note-hold-bottom", os.path.join(
-                self.config.resources_dir, "textures/notes/hold-bottom.png"), TextureCreateTypes.PATH
-        )
-        self.renderer.texture_manager.create_texture(
-            self.renderer.ctx, "note-hold-middle", os.path.join(
-                self.config.resources_dir, "textures/notes/hold-middle.png"), TextureCreateTypes.PATH
-        )
-        self.renderer.texture_manager.create_texture(
-            self.renderer.ctx, "note-hold-top", os.path.join(
-                self.config.resources_dir, "textures/notes/hold-top.png"), TextureCreateTypes.PATH
+        # 所有 Note 纹理打包为一张图集，渲染 Note 时无需切换纹理
+        self.renderer.texture_manager.create_atlas(
+            self.renderer.ctx, "notes", {
+                name: os.path.join(self.config.resources_dir, f"textures/notes/{name[5:]}.png")
+                for name in ("note-tap", "note-drag", "note-flick",
+                             "note-hold-bottom", "note-hold-middle", "note-hold-top")
+            }, TextureCreateTypes.PATH
         )
 
     def _get_note_scale(self) -> dict[str, float]:
-        note_width = self.config.width * 0.123
+        note_width = self.config.width * PHI_NOTE_WIDTH_RATIO
         note_textures = (
             "note-tap", "note-drag", "note-flick", "note-hold-bottom", "note-hold-middle", "note-hold-top"
         )
@@ -201,20 +255,70 @@ class Player:
 
         self.timer.start()
 
-    def update(self, time: float | None = None):
+    def seek(self, time: float):
         if not self.loaded_chart:
             logger.warning("未导入谱面文件")
 
             return
 
+        self.chart.seek(self.chart.to_chart_time(time))
+
+    def update(self, time: float | None = None):
+        if not self.update_state(time):
+            return
+
+        self.render()
+
+    def update_state(self, time: float | None = None) -> bool:
+        """
+        计算当前帧的谱面状态 (并播放打击音效)，不进行绘制，未导入谱面时返回 False
+        """
+        if not self.loaded_chart:
+            logger.warning("未导入谱面文件")
+
+            return False
+
         if time is None:
             now_time = self.timer.get_time()
         else:
             now_time = time
-        chart_time = self.chart.to_chart_time(now_time)
+        self.chart_time = self.chart.to_chart_time(now_time)
+
+        self.chart.update(self.chart_time, self.sound_manager)
+
+        return True
+
+    def get_frame_signature(self) -> bytes | None:
+        """
+        update_state 之后调用，返回本帧画面的签名，签名相同的两帧画面完全相同，
+        无法判断时 (GPU Note 渲染的画面取决于时间、非官谱格式谱面) 返回 None
+        """
+        if self.gpu_notes is not None or not isinstance(self.chart, PhiChart):
+            return None
+
+        background = ((self.illustration_version, self.config.ill_brightness)
+                      if self.loaded_illustration else None)
 
+        return repr(background).encode("utf-8") + self.chart.get_frame_signature()
+
+    def render(self):
+        """
+        绘制 update_state 计算出的当前帧
+        """
         if self.loaded_illustration:
             self.render_illustration()
 
-        self.chart.update(chart_time, self.sound_manager)
-        self.chart.render(self.renderer, self.notes_texture_scale)
+        self.renderer.begin_batch()
+
+        if self.config.use_draw_list:
+            self.draw_list.clear()
+            self.chart.render(self.draw_list, self.notes_texture_scale)
+            self.renderer.submit(self.draw_list)
+        else:
+            self.chart.render(self.renderer, self.notes_texture_scale)
+
+        self.renderer.end_batch()
+
+        # GPU 上的 Note 在批处理 (判定线与 CPU 计算的 Note) 之后绘制，见 GPUNoteRenderer
+        if self.gpu_notes is not None:
+            self.gpu_notes.render(self.chart_time)
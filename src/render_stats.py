@@ -0,0 +1,34 @@
+class RenderStats:
+    """
+    渲染状态统计 (绘制调用、Uniform 写入、纹理绑定等)，由 Renderer.new_frame 每帧重置
+    """
+
+    def __init__(self):
+        self.last_program: int | None = None  # 上一次绘制使用的着色器程序 (glo)
+
+        self.reset()
+
+    def reset(self):
+        self.draw_calls = 0
+        self.program_switches = 0
+        self.uniform_writes = 0
+        self.uniform_skips = 0
+        self.texture_binds = 0
+        self.texture_bind_skips = 0
+
+    def record_draw(self, program: int):
+        self.draw_calls += 1
+
+        if program != self.last_program:
+            self.program_switches += 1
+            self.last_program = program
+
+    def to_dict(self) -> dict[str, int]:
+        return {
+            "draw_calls": self.draw_calls,
+            "program_switches": self.program_switches,
+            "uniform_writes": self.uniform_writes,
+            "uniform_skips": self.uniform_skips,
+            "texture_binds": self.texture_binds,
+            "texture_bind_skips": self.texture_bind_skips
+        }
@@ -1,3 +1,4 @@
+from typing import Any, Callable
 import os
 
 import moderngl as mgl
@@ -5,6 +6,32 @@ import moderngl as mgl
 from .config import *
 from .shader import *
 from .texture import *
+from .sprite_batch import SpriteBatch
+from .draw_list import DrawList, DrawCommandTypes
+from .render_stats import RenderStats
+
+
+# 普通 Alpha 混合，Alpha 通道累加
+BLEND_FUNC_ALPHA = (mgl.SRC_ALPHA, mgl.ONE_MINUS_SRC_ALPHA, mgl.ONE, mgl.ONE)
+# 合成静态图层: 图层颜色已按上述混合方式与透明黑色合成 (即预乘 Alpha)
+BLEND_FUNC_PREMULTIPLIED = (mgl.ONE, mgl.ONE_MINUS_SRC_ALPHA, mgl.ONE, mgl.ONE)
+
+
+class StaticLayer:
+    """
+    静态图层，内容只在 key 变化时重新绘制到离屏帧缓冲 (Renderer.bake_layer)，
+    之后每帧一次绘制合成到当前帧缓冲 (Renderer.render_layer)
+    """
+
+    def __init__(self, name: str, frame_buffer: mgl.Framebuffer):
+        self.name = name
+        self.frame_buffer = frame_buffer
+
+        self.key: Any = None
+        self.baked = False
+
+    def is_valid(self, key: Any) -> bool:
+        return self.baked and self.key == key
 
 
 class Renderer:
@@ -13,15 +40,26 @@ class Renderer:
 
         self.ctx = mgl.create_context(standalone=standalone)
 
+        # 渲染状态统计，last_frame_stats 为上一帧的统计结果
+        self.stats = RenderStats()
+        self.last_frame_stats: dict[str, int] = self.stats.to_dict()
+
         # 初始化着色器
-        self.shader_manager = ShaderManager()
+        self.shader_manager = ShaderManager(self.stats)
         self._init_shaders()
 
         # 初始化纹理
-        self.texture_manager = TextureManager()
+        self.texture_manager = TextureManager(self.stats)
+
+        # 精灵批处理，begin_batch 与 end_batch 之间的绘制会合并为实例化绘制
+        self.sprite_batch = SpriteBatch(
+            self.ctx, self.config, self.texture_manager, stats=self.stats)
+        self.batching = False
 
         self.frame_buffer: mgl.Framebuffer = None
 
+        self.layers: dict[str, StaticLayer] = {}
+
     def create_frame_buffer(self, components: int = 4, filter: tuple[int, int] = (mgl.LINEAR, mgl.LINEAR), repeat: bool = False):
         color_texture = self.ctx.texture(
             (self.config.width, self.config.height), components)
@@ -36,16 +74,103 @@ class Renderer:
     def set_blend(self, enable: bool = True):
         if enable:
             self.ctx.enable(mgl.BLEND)
-            self.ctx.blend_func = (
-                mgl.SRC_ALPHA, mgl.ONE_MINUS_SRC_ALPHA,
-                mgl.ONE, mgl.ONE
-            )
+            self.ctx.blend_func = BLEND_FUNC_ALPHA
         else:
             self.ctx.disable(mgl.BLEND)
 
     def clear(self, color: list[float] | tuple[float] = (0, 0, 0, 0)):
         self.ctx.clear(color=color)
 
+    def new_frame(self):
+        """
+        每帧开始时调用，保存上一帧的统计并重置计数
+        """
+        self.last_frame_stats = self.stats.to_dict()
+        self.stats.reset()
+
+    def begin_batch(self):
+        if not self.config.batch_sprites:
+            return
+
+        self.batching = True
+
+    def flush_batch(self):
+        if self.batching:
+            self.sprite_batch.flush()
+
+    def end_batch(self):
+        if not self.batching:
+            return
+
+        self.sprite_batch.flush()
+        self.batching = False
+
+    def get_layer(self, name: str) -> StaticLayer:
+        """
+        获取静态图层，不存在时创建，图层的颜色纹理以图层名注册到 TextureManager
+        """
+        if name in self.layers:
+            return self.layers[name]
+
+        color_texture = self.ctx.texture(
+            (self.config.width, self.config.height), 4)
+        color_texture.filter = (mgl.NEAREST, mgl.NEAREST)
+
+        self.texture_manager.add_texture(name, color_texture)
+
+        layer = self.layers[name] = StaticLayer(
+            name, self.ctx.framebuffer(color_texture))
+
+        return layer
+
+    def bake_layer(self, layer: StaticLayer, draw: Callable[[], None], key: Any = None):
+        """
+        清空图层并调用 draw 重新绘制图层内容
+        """
+        self.flush_batch()  # 切换帧缓冲前提交已缓存的精灵
+
+        previous_frame_buffer = self.ctx.fbo
+
+        layer.frame_buffer.use()
+        layer.frame_buffer.clear(0, 0, 0, 0)
+
+        draw()
+
+        self.flush_batch()
+        previous_frame_buffer.use()
+
+        layer.key = key
+        layer.baked = True
+
+    def render_layer(self, layer: StaticLayer):
+        self.flush_batch()
+
+        self.ctx.blend_func = BLEND_FUNC_PREMULTIPLIED
+
+        self.shader_manager.set_shader_uniform("layer", "texture", 0)
+        self.texture_manager.use_texture(layer.name, 0)
+
+        self.shader_manager.use_shader("layer", mode=mgl.TRIANGLE_STRIP)
+
+        self.ctx.blend_func = BLEND_FUNC_ALPHA
+
+    def submit(self, draw_list: DrawList):
+        """
+        按顺序绘制 DrawList 中的命令，批处理中提交时同样会合并为实例化绘制
+        """
+        texture_names = draw_list.texture_names
+
+        for (type, textures, x, y, end_x, end_y, sx, sy,
+             r, color, anchor, show_head) in draw_list.commands:
+            if type == DrawCommandTypes.RECT:
+                self.render_rect(x, y, sx[0], sy[0], r, color, anchor)
+            elif type == DrawCommandTypes.TEXTURE:
+                self.render_texture(
+                    texture_names[textures[0]], x, y, sx[0], sy[0], r, color, anchor)
+            else:
+                self.render_hold(tuple(texture_names[texture] for texture in textures),
+                                 x, y, end_x, end_y, r, sx, sy, show_head, color)
+
     def _init_shaders(self):
         # 渲染矩形着色器初始化
         with open(os.path.join(self.config.resources_dir, "shaders/rect/rect.vert")) as vert_file, open(os.path.join(self.config.resources_dir, "shaders/rect/rect.frag")) as frag_file:
@@ -99,10 +224,62 @@ class Renderer:
             (self.config.width, self.config.height)
         )
 
+        # 静态图层着色器初始化
+        with open(os.path.join(self.config.resources_dir, "shaders/layer/layer.vert")) as vert_file, open(os.path.join(self.config.resources_dir, "shaders/layer/layer.frag")) as frag_file:
+            self.shader_manager.create_shader(
+                self.ctx,
+                "layer",
+                [
+                    -1.0, -1.0,
+                    1.0, -1.0,
+                    1.0, 1.0,
+                    -1.0, 1.0
+                ],
+                vert_file.read(),
+                frag_file.read(),
+                in_types="2f",
+                in_vars=["in_pos"],
+                indices=[
+                    0, 1, 2,
+                    0, 3, 2
+                ]
+            )
+
+        # 渲染长条着色器初始化 (长条头、长条身、长条尾合并为一个四边形)
+        with open(os.path.join(self.config.resources_dir, "shaders/hold/hold.vert")) as vert_file, open(os.path.join(self.config.resources_dir, "shaders/hold/hold.frag")) as frag_file:
+            self.shader_manager.create_shader(
+                self.ctx,
+                "hold",
+                [
+                    -1.0, -1.0,
+                    1.0, -1.0,
+                    1.0, 1.0,
+                    -1.0, 1.0
+                ],
+                vert_file.read(),
+                frag_file.read(),
+                in_types="2f",
+                in_vars=["in_pos"],
+                indices=[
+                    0, 1, 2,
+                    0, 3, 2
+                ]
+            )
+
+        self.shader_manager.set_shader_uniform(
+            "hold", "screenSize",
+            (self.config.width, self.config.height)
+        )
+
     def render_rect(self, x: float, y: float, w: float, h: float,
                     r: float, color: list[float] | tuple[float] = (1, 1, 1, 1),
                     anchor: list[float] | tuple[float] = (0.5, 0.5)):
 
+        if self.batching:
+            self.sprite_batch.add_rect(x, y, w, h, r, color, anchor)
+
+            return
+
         self.shader_manager.set_shader_uniform("rect", "position", (x, y))
         self.shader_manager.set_shader_uniform("rect", "size", (w, h))
         self.shader_manager.set_shader_uniform("rect", "anchor", anchor)
@@ -115,6 +292,12 @@ class Renderer:
                        r: float, color: list[float] | tuple[float] = (1, 1, 1, 1),
                        anchor: list[float] | tuple[float] = (0.5, 0.5)):
 
+        if self.batching:
+            self.sprite_batch.add_texture(
+                texture_name, x, y, sx, sy, r, color, anchor)
+
+            return
+
         self.shader_manager.set_shader_uniform("texture", "position", (x, y))
         self.shader_manager.set_shader_uniform("texture", "scale", (sx, sy))
         self.shader_manager.set_shader_uniform("texture", "textureSize",
@@ -123,7 +306,63 @@ class Renderer:
         self.shader_manager.set_shader_uniform("texture", "rotation", r)
         self.shader_manager.set_shader_uniform("texture", "color", color)
 
+        texture_name, uv_rect = self.texture_manager.get_texture_region(
+            texture_name)
+        self.shader_manager.set_shader_uniform("texture", "uvRect", uv_rect)
+
         self.shader_manager.set_shader_uniform("texture", "texture", 0)
         self.texture_manager.use_texture(texture_name, 0)
 
         self.shader_manager.use_shader("texture", mode=mgl.TRIANGLE_STRIP)
+
+    def render_hold(self, texture_names: tuple[str, str, str], x: float, y: float, end_x: float, end_y: float,
+                    r: float, sx: tuple[float, float, float], sy: tuple[float, float, float], show_head: bool,
+                    color: list[float] | tuple[float] = (1, 1, 1, 1)):
+        """
+        绘制长条，texture_names / sx / sy 的顺序为 (长条身, 长条头, 长条尾)，与三次 render_texture 的参数相同，
+        三张纹理位于同一图集时使用长条着色器一次绘制，批处理中或纹理不在同一图集时拆分为三个精灵
+        """
+        texture_regions = [self.texture_manager.get_texture_region(
+            name) for name in texture_names]
+
+        if self.batching or len({texture_name for texture_name, _ in texture_regions}) != 1:
+            if show_head:
+                self.render_texture(texture_names[1], x, y, sx[1], sy[1], r,
+                                    color=color, anchor=(0.5, 1))
+
+            self.render_texture(texture_names[0], x, y, sx[0], sy[0], r,
+                                color=color, anchor=(0.5, 0))
+            self.render_texture(texture_names[2], end_x, end_y, sx[2], sy[2], r,
+                                color=color, anchor=(0.5, 0))
+
+            return
+
+        (body_width, body_height), (head_width, head_height), (tail_width, tail_height) = (
+            self.texture_manager.get_texture_size(name) for name in texture_names)
+
+        # 长条尾的 sy 符号即为 isAbove (长条身的 sy 在长度为 0 时也为 0)
+        is_above = -1.0 if sy[2] < 0 else 1.0
+
+        self.shader_manager.set_shader_uniform("hold", "position", (x, y))
+        self.shader_manager.set_shader_uniform("hold", "rotation", r)
+        self.shader_manager.set_shader_uniform("hold", "isAbove", is_above)
+        self.shader_manager.set_shader_uniform(
+            "hold", "headSize", (head_width * sx[1], head_height * sy[1] * is_above))
+        self.shader_manager.set_shader_uniform(
+            "hold", "bodySize", (body_width * sx[0], max(0.0, body_height * sy[0] * is_above)))
+        self.shader_manager.set_shader_uniform(
+            "hold", "tailSize", (tail_width * sx[2], tail_height * sy[2] * is_above))
+        self.shader_manager.set_shader_uniform("hold", "showHead", show_head)
+        self.shader_manager.set_shader_uniform("hold", "color", color)
+
+        self.shader_manager.set_shader_uniform(
+            "hold", "bodyUvRect", texture_regions[0][1])
+        self.shader_manager.set_shader_uniform(
+            "hold", "headUvRect", texture_regions[1][1])
+        self.shader_manager.set_shader_uniform(
+            "hold", "tailUvRect", texture_regions[2][1])
+
+        self.shader_manager.set_shader_uniform("hold", "texture", 0)
+        self.texture_manager.use_texture(texture_regions[0][0], 0)
+
+        self.shader_manager.use_shader("hold", mode=mgl.TRIANGLE_STRIP)
@@ -0,0 +1,302 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from dataclasses import asdict, replace
+from io import BytesIO
+import hashlib
+import json
+import multiprocessing
+import os
+import shutil
+import subprocess
+
+import tqdm
+from loguru import logger
+
+from .config import Config
+
+
+SEGMENT_DIR_SUFFIX = ".segments"
+SEGMENT_LIST_NAME = "segments.txt"
+SEGMENT_MANIFEST_NAME = "manifest.json"
+
+# 清单格式版本，片段的存储方式变化时需要递增
+SEGMENT_MANIFEST_VERSION = 1
+
+# 不影响画面内容的配置项，不计入渲染哈希
+RENDER_KEY_IGNORED_FIELDS = (
+    "package_path", "use_chart_cache", "chart_cache_dir",
+    "chart_load_workers", "chart_load_executor",
+    "video_output_path", "readback_buffers", "video_write_queue",
+    "render_workers", "render_chunk_seconds", "skip_static_frames"
+)
+
+
+_worker_app = None  # 子进程中复用的 PyPR，由 _init_worker 创建
+
+
+def _init_worker(config: Config, chart_data: bytes, illustration: str | bytes | None):
+    """
+    子进程初始化: 创建 OpenGL 上下文与 Player 并加载谱面和曲绘，之后渲染的所有片段共用
+    """
+    global _worker_app
+
+    from .main import PyPR
+
+    _worker_app = PyPR(args=asdict(config))
+
+    _worker_app.import_chart(chart_data)
+
+    if illustration:
+        _worker_app.import_illustration(illustration)
+
+
+def _render_segment(start_frame: int, end_frame: int, output_path: str) -> int:
+    """
+    在子进程中渲染 [start_frame, end_frame) 的画面到 output_path (不含音频)
+    """
+    from .video_renderer import VideoRenderer
+
+    app = _worker_app
+    app.video_renderer = VideoRenderer(
+        replace(app.config, video_output_path=output_path))
+
+    app.video_renderer.create_popen(audio_path=None)
+    app.render_frames(start_frame, end_frame)
+    app.video_renderer.close()
+
+    return end_frame - start_frame
+
+
+class SegmentManifest:
+    """
+    分段渲染清单，记录渲染哈希、片段划分与已完成的片段，
+    重新渲染时哈希与划分一致则跳过已完成的片段
+    """
+
+    def __init__(self, path: str, key: str, segments: list[tuple[int, int]]):
+        self.path = path
+        self.key = key
+        self.segments = segments
+
+        self.completed: set[int] = set()
+
+    def load(self) -> bool:
+        """
+        读取已完成的片段，清单不存在或与当前渲染不一致时返回 False
+        """
+        if not os.path.isfile(self.path):
+            return False
+
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logger.warning(f"分段渲染清单读取失败: {e}")
+
+            return False
+
+        if (data.get("version") != SEGMENT_MANIFEST_VERSION or data.get("key") != self.key or
+                [tuple(segment) for segment in data.get("segments", [])] != self.segments):
+            return False
+
+        self.completed = {index for index in data.get("completed", [])
+                          if 0 <= index < len(self.segments)}
+
+        return True
+
+    def save(self):
+        temp_path = f"{self.path}.tmp"
+
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": SEGMENT_MANIFEST_VERSION,
+                "key": self.key,
+                "segments": self.segments,
+                "completed": sorted(self.completed)
+            }, f, indent=4)
+
+        os.replace(temp_path, self.path)  # 写入完成后再替换，中断时不会留下不完整的清单
+
+    def mark_completed(self, index: int):
+        self.completed.add(index)
+        self.save()
+
+
+class SegmentRenderer:
+    """
+    将视频时间轴切分为多个片段，由子进程 (各自使用独立的 OpenGL 上下文、Player 与 ffmpeg) 渲染，
+    最后使用 ffmpeg concat 分离器无损拼接并混入音频，
+    片段与清单保存在 输出路径 + SEGMENT_DIR_SUFFIX 目录中，渲染中断后重新运行时只渲染未完成的片段
+    """
+
+    @staticmethod
+    def split(total_frame: int, segment_num: int) -> list[tuple[int, int]]:
+        """
+        将 [0, total_frame) 均分为 segment_num 段，返回各段的 (起始帧, 结束帧)
+        """
+        segment_num = max(1, min(segment_num, total_frame))
+        bounds = [total_frame * index // segment_num for index in range(segment_num + 1)]
+
+        return [(start, end) for start, end in zip(bounds[:-1], bounds[1:]) if end > start]
+
+    @staticmethod
+    def split_by_length(total_frame: int, segment_frames: int) -> list[tuple[int, int]]:
+        """
+        按固定帧数切分，最后一段可能较短
+        """
+        segment_frames = max(1, segment_frames)
+
+        return [(start, min(start + segment_frames, total_frame))
+                for start in range(0, total_frame, segment_frames)]
+
+    @staticmethod
+    def get_segment_path(segment_dir: str, index: int, output_path: str) -> str:
+        return os.path.join(segment_dir, f"segment_{index:04d}{os.path.splitext(output_path)[1] or '.mp4'}")
+
+    @staticmethod
+    def get_render_key(config: Config, chart_data: bytes, illustration: str | bytes | None,
+                       audio_path: str | None) -> str:
+        """
+        谱面、曲绘、音频与影响画面的配置项的哈希
+        """
+        render_hash = hashlib.sha256()
+
+        config_data = {key: value for key, value in asdict(config).items()
+                       if key not in RENDER_KEY_IGNORED_FIELDS}
+        render_hash.update(json.dumps(config_data, sort_keys=True).encode("utf-8"))
+
+        render_hash.update(hashlib.sha256(chart_data).digest())
+
+        for data in (illustration, audio_path):
+            if isinstance(data, str) and os.path.isfile(data):
+                with open(data, "rb") as f:
+                    data = f.read()
+
+            render_hash.update(hashlib.sha256(
+                data if isinstance(data, bytes) else b"").digest())
+
+        return render_hash.hexdigest()
+
+    @staticmethod
+    def render(config: Config, chart_data: bytes, illustration: str | bytes | BytesIO | None,
+               total_frame: int, output_path: str, audio_path: str | None, workers: int,
+               segment_frames: int = 0):
+        """
+        segment_frames 为 0 时均分为 workers 段，否则按 segment_frames 帧一段切分
+        """
+        if total_frame <= 0:
+            raise ValueError(f"视频总帧数为 {total_frame}，请检查是否已导入音乐")
+
+        if isinstance(illustration, BytesIO):
+            illustration = illustration.getvalue()
+
+        segments = (SegmentRenderer.split_by_length(total_frame, segment_frames) if segment_frames > 0
+                    else SegmentRenderer.split(total_frame, workers))
+
+        segment_dir = output_path + SEGMENT_DIR_SUFFIX
+        os.makedirs(segment_dir, exist_ok=True)
+
+        segment_paths = [SegmentRenderer.get_segment_path(segment_dir, index, output_path)
+                         for index in range(len(segments))]
+
+        manifest = SegmentManifest(
+            os.path.join(segment_dir, SEGMENT_MANIFEST_NAME),
+            SegmentRenderer.get_render_key(config, chart_data, illustration, audio_path), segments)
+
+        if manifest.load():
+            # 清单中已完成但文件丢失的片段重新渲染
+            manifest.completed = {index for index in manifest.completed
+                                  if os.path.isfile(segment_paths[index])}
+
+            logger.info(f"继续上次的渲染，已完成 {len(manifest.completed)} / {len(segments)} 个片段")
+
+        manifest.save()
+
+        pending = [index for index in range(len(segments)) if index not in manifest.completed]
+
+        if pending:
+            worker_num = max(1, min(workers, len(pending)))
+            completed_frames = total_frame - sum(segments[index][1] - segments[index][0]
+                                                 for index in pending)
+
+            logger.info(f"使用 {worker_num} 个进程渲染 {len(pending)} 个视频片段...")
+
+            # 子进程需要创建独立的 OpenGL 上下文，不能从已创建上下文的进程 fork
+            with ProcessPoolExecutor(max_workers=worker_num, mp_context=multiprocessing.get_context("spawn"),
+                                     initializer=_init_worker,
+                                     initargs=(replace(config, render_workers=1), chart_data, illustration)) as executor, \
+                    tqdm.tqdm(total=total_frame, initial=completed_frames, desc="渲染视频...", unit="帧") as bar:
+                futures = {
+                    executor.submit(_render_segment, *segments[index], segment_paths[index]): index
+                    for index in pending
+                }
+                running = set(futures)
+
+                error: Exception | None = None
+
+                # 某个片段失败时取消尚未开始的片段，正在渲染的片段完成后仍记入清单，重新运行时跳过
+                try:
+                    while running:
+                        done, running = wait(running, return_when=FIRST_COMPLETED)
+
+                        for future in done:
+                            try:
+                                frames = future.result()
+                            except Exception as e:
+                                if error is None:
+                                    error = e
+                                    logger.error(f"片段 {futures[future]} 渲染失败，取消未开始的片段")
+
+                                    executor.shutdown(wait=False, cancel_futures=True)
+
+                                continue
+
+                            bar.update(frames)
+
+                            manifest.mark_completed(futures[future])
+
+                        # 被取消的片段不会再完成，不能继续等待
+                        running = {future for future in running if not future.cancelled()}
+                except BaseException:
+                    # 中断 (如 KeyboardInterrupt) 时同样取消尚未开始的片段，只等待正在渲染的片段
+                    executor.shutdown(wait=False, cancel_futures=True)
+
+                    raise
+
+                if error is not None:
+                    raise error
+
+        SegmentRenderer.concat(segment_paths, audio_path, output_path, segment_dir)
+
+        shutil.rmtree(segment_dir, ignore_errors=True)
+
+    @staticmethod
+    def concat(segment_paths: list[str], audio_path: str | None, output_path: str, list_dir: str):
+        """
+        按顺序拼接片段 (视频流直接复制，不重新编码)，并混入音频
+        """
+        list_path = os.path.join(list_dir, SEGMENT_LIST_NAME)
+
+        with open(list_path, "w", encoding="utf-8") as f:
+            for path in segment_paths:
+                escaped_path = os.path.abspath(path).replace("'", "'\\''")
+                f.write(f"file '{escaped_path}'\n")
+
+        ffmpeg_command = [
+            "ffmpeg", "-y",
+            "-f", "concat",
+            "-safe", "0",
+            "-i", list_path,
+            *(("-i", audio_path) if audio_path is not None else ()),
+            "-c:v", "copy",
+            *(("-c:a", "aac", "-b:a", "128k", "-strict", "experimental") if audio_path is not None else ()),
+            output_path
+        ]
+
+        result = subprocess.run(ffmpeg_command, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+        if result.returncode != 0:
+            stderr = result.stderr.decode("utf-8", "replace").strip()
+
+            raise RuntimeError(f"ffmpeg 拼接视频片段失败 (退出码: {result.returncode})\n{stderr}")
+
+        logger.info(f"视频已输出到 {output_path}")
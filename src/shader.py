@@ -4,12 +4,16 @@ import moderngl as mgl
 import numpy as np
 from loguru import logger
 
+from .render_stats import RenderStats
+
 
 class Shader:
     def __init__(self, ctx: mgl.Context, vertices: list[float],
                  vertex_code: str, fragment_code: str,
                  in_types: str, in_vars: list[str] = [],
-                 indices: list[int] = []):
+                 indices: list[int] = [], stats: RenderStats | None = None):
+
+        self.stats = stats if stats is not None else RenderStats()
 
         self.vbo = ctx.buffer(np.array(vertices, dtype="f4"))
 
@@ -36,16 +40,35 @@ class Shader:
                 [[self.vbo, in_types] + in_vars]
             )
 
+        # Uniform 对象和上一次写入的值，值未变化时跳过写入
+        self.uniforms: dict[str, mgl.Uniform] = {
+            key: self.program[key] for key in self.program
+            if isinstance(self.program[key], mgl.Uniform)
+        }
+        self.uniform_values: dict[str, Any] = {}
+
     def set_uniform(self, key: str, value: Any):
-        if key in self.program:
-            self.program[key] = value
-        else:
+        if not key in self.uniforms:
             logger.warning(f"不存在 Uniform {key}")
             return
 
+        if isinstance(value, list):
+            value = tuple(value)
+
+        if self.uniform_values.get(key) == value:
+            self.stats.uniform_skips += 1
+            return
+
+        self.uniforms[key].value = value
+        self.uniform_values[key] = value
+
+        self.stats.uniform_writes += 1
+
     def render(self, mode: int | None = mgl.TRIANGLES):
         self.vao.render(mode=mode)
 
+        self.stats.record_draw(self.program.glo)
+
     def release(self):
         self.vao.release()
         self.program.release()
@@ -57,9 +80,11 @@ class Shader:
 
 
 class ShaderManager:
-    def __init__(self):
+    def __init__(self, stats: RenderStats | None = None):
         self.shaders: dict[str, Shader] = {}
 
+        self.stats = stats if stats is not None else RenderStats()
+
     def create_shader(self, ctx: mgl.Context, name: str, vertices: list[float],
                       vertex_code: str, fragment_code: str,
                       in_types: str, in_vars: list[str] = [],
@@ -74,7 +99,7 @@ class ShaderManager:
         new_shader = Shader(ctx, vertices,
                             vertex_code, fragment_code,
                             in_types=in_types, in_vars=in_vars,
-                            indices=indices)
+                            indices=indices, stats=self.stats)
 
         self.shaders[name] = new_shader
 
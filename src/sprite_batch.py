@@ -0,0 +1,144 @@
+import os
+
+import moderngl as mgl
+import numpy as np
+
+from .config import *
+from .texture import TextureManager
+from .render_stats import RenderStats
+
+
+# 每个实例: position(2) size(2) scale(2) anchor(2) rotation(1) color(4) uvRect(4)，
+# size 与 scale 分开传入，顶点计算顺序与 rect / texture 着色器一致
+SPRITE_INSTANCE_FORMAT = "2f 2f 2f 2f 1f 4f 4f/i"
+SPRITE_INSTANCE_ATTRIBUTES = ["in_position", "in_size", "in_scale", "in_anchor",
+                              "in_rotation", "in_color", "in_uvRect"]
+SPRITE_INSTANCE_FLOATS = 17
+
+SPRITE_FULL_UV_RECT = (0.0, 0.0, 1.0, 1.0)
+
+RECT_BATCH_KEY = None  # 矩形批次不绑定纹理
+
+
+class SpriteBatch:
+    """
+    实例化精灵批处理，连续且纹理相同 (或均为矩形) 的精灵合并为一次实例化绘制，
+    纹理或着色器变化时提交当前批次，因此绘制顺序与逐个绘制一致
+    """
+
+    def __init__(self, ctx: mgl.Context, config: Config, texture_manager: TextureManager,
+                 capacity: int = 4096, stats: RenderStats | None = None):
+        self.ctx = ctx
+        self.texture_manager = texture_manager
+
+        self.stats = stats if stats is not None else RenderStats()
+
+        self.quad_vbo = ctx.buffer(np.array([
+            -1.0, -1.0, 0.0, 0.0,
+            1.0, -1.0, 1.0, 0.0,
+            1.0, 1.0, 1.0, 1.0,
+            -1.0, 1.0, 0.0, 1.0
+        ], dtype="f4"))
+        self.quad_ibo = ctx.buffer(np.array([
+            0, 1, 2,
+            0, 3, 2
+        ], dtype="i4"))
+
+        self.instance_vbo = ctx.buffer(
+            reserve=capacity * SPRITE_INSTANCE_FLOATS * 4, dynamic=True)
+
+        shader_dir = os.path.join(config.resources_dir, "shaders/sprite")
+
+        with open(os.path.join(shader_dir, "sprite.vert")) as vert_file:
+            vertex_code = vert_file.read()
+
+        with open(os.path.join(shader_dir, "sprite.frag")) as frag_file:
+            self.texture_program = ctx.program(
+                vertex_shader=vertex_code, fragment_shader=frag_file.read())
+
+        with open(os.path.join(shader_dir, "rect.frag")) as frag_file:
+            self.rect_program = ctx.program(
+                vertex_shader=vertex_code, fragment_shader=frag_file.read())
+
+        for program in (self.texture_program, self.rect_program):
+            program["screenSize"] = (config.width, config.height)
+
+        self.texture_program["texture"] = 0
+
+        self.texture_vao = self._create_vertex_array(self.texture_program)
+        self.rect_vao = self._create_vertex_array(self.rect_program)
+
+        self.instances: list[float] = []
+        self.key: str | None = RECT_BATCH_KEY  # 当前批次的纹理名
+
+    def _create_vertex_array(self, program: mgl.Program) -> mgl.VertexArray:
+        return self.ctx.vertex_array(
+            program,
+            [
+                (self.quad_vbo, "2f 2f", "in_pos", "in_texCoord"),
+                (self.instance_vbo, SPRITE_INSTANCE_FORMAT,
+                 *SPRITE_INSTANCE_ATTRIBUTES)
+            ],
+            index_buffer=self.quad_ibo,
+            skip_errors=True  # 矩形着色器不使用纹理坐标，相关属性会被优化掉
+        )
+
+    def add_rect(self, x: float, y: float, w: float, h: float, r: float,
+                 color: list[float] | tuple[float], anchor: list[float] | tuple[float]):
+        if self.key is not RECT_BATCH_KEY:
+            self.flush()
+
+        self.key = RECT_BATCH_KEY
+        self.instances.extend((x, y, w, h, 1.0, 1.0, *anchor, r, *color, *SPRITE_FULL_UV_RECT))
+
+    def add_texture(self, texture_name: str, x: float, y: float, sx: float, sy: float,
+                    r: float, color: list[float] | tuple[float], anchor: list[float] | tuple[float]):
+        # 图集子图按所在图集分批，同一图集内的不同子图可以合并为一次绘制
+        batch_texture_name, uv_rect = self.texture_manager.get_texture_region(
+            texture_name)
+
+        if self.key != batch_texture_name:
+            self.flush()
+
+        width, height = self.texture_manager.get_texture_size(texture_name)
+
+        self.key = batch_texture_name
+        self.instances.extend((x, y, width, height, sx, sy,
+                              *anchor, r, *color, *uv_rect))
+
+    def flush(self):
+        """
+        提交当前批次
+        """
+        if not self.instances:
+            return
+
+        data = np.array(self.instances, dtype="f4")
+        self.instances.clear()
+
+        if data.nbytes > self.instance_vbo.size:  # 扩容时按 2 倍增长，避免频繁重新分配
+            self.instance_vbo.orphan(max(data.nbytes, self.instance_vbo.size * 2))
+
+        self.instance_vbo.write(data)
+
+        instance_num = len(data) // SPRITE_INSTANCE_FLOATS
+
+        # 与 Renderer.render_rect / render_texture 相同使用 TRIANGLE_STRIP，保证混合结果一致
+        if self.key is RECT_BATCH_KEY:
+            self.rect_vao.render(mgl.TRIANGLE_STRIP, instances=instance_num)
+
+            self.stats.record_draw(self.rect_program.glo)
+        else:
+            self.texture_manager.use_texture(self.key, location=0)
+            self.texture_vao.render(mgl.TRIANGLE_STRIP, instances=instance_num)
+
+            self.stats.record_draw(self.texture_program.glo)
+
+    def release(self):
+        self.texture_vao.release()
+        self.rect_vao.release()
+        self.texture_program.release()
+        self.rect_program.release()
+        self.instance_vbo.release()
+        self.quad_ibo.release()
+        self.quad_vbo.release()
@@ -6,6 +6,8 @@ import moderngl as mgl
 from PIL import Image
 from loguru import logger
 
+from .render_stats import RenderStats
+
 
 class TextureConverter:
     @staticmethod
@@ -56,6 +58,65 @@ class TextureConverter:
         return texture
 
 
+class TextureAtlas:
+    @staticmethod
+    def pack(images: dict[str, Image.Image], padding: int = 2,
+             max_width: int = 4096) -> tuple[Image.Image, dict[str, tuple[int, int, int, int]]]:
+        """
+        按行 (shelf) 将多张图片打包为一张图集，返回图集和各图片的像素区域 (x, y, w, h，左上角为原点)，
+        每张图片四周用边缘像素向外扩展 padding 像素，线性过滤时效果与 CLAMP_TO_EDGE 一致
+        """
+        max_width = max([max_width] + [image.width + padding * 2
+                                       for image in images.values()])
+
+        # 按高度从大到小放置以减少每行的空隙
+        names = sorted(images, key=lambda name: images[name].height, reverse=True)
+
+        positions: dict[str, tuple[int, int]] = {}
+        x = y = row_height = atlas_width = 0
+
+        for name in names:
+            width = images[name].width + padding * 2
+            height = images[name].height + padding * 2
+
+            if x + width > max_width:  # 换行
+                x = 0
+                y += row_height
+                row_height = 0
+
+            positions[name] = (x, y)
+
+            x += width
+            row_height = max(row_height, height)
+            atlas_width = max(atlas_width, x)
+
+        atlas = Image.new("RGBA", (max(1, atlas_width), max(1, y + row_height)))
+        regions: dict[str, tuple[int, int, int, int]] = {}
+
+        for name, (x, y) in positions.items():
+            image = images[name]
+            w, h = image.size
+            left, top = x + padding, y + padding
+
+            atlas.paste(image, (left, top))
+
+            if padding and w and h:
+                # 边缘扩展
+                atlas.paste(image.crop((0, 0, w, 1)).resize((w, padding)), (left, y))
+                atlas.paste(image.crop((0, h - 1, w, h)).resize((w, padding)), (left, top + h))
+                atlas.paste(image.crop((0, 0, 1, h)).resize((padding, h)), (x, top))
+                atlas.paste(image.crop((w - 1, 0, w, h)).resize((padding, h)), (left + w, top))
+
+                for corner_x, corner_y, dst_x, dst_y in ((0, 0, x, y), (w - 1, 0, left + w, y),
+                                                         (0, h - 1, x, top + h), (w - 1, h - 1, left + w, top + h)):
+                    atlas.paste(image.crop((corner_x, corner_y, corner_x + 1, corner_y + 1)).resize(
+                        (padding, padding)), (dst_x, dst_y))
+
+            regions[name] = (left, top, w, h)
+
+        return atlas, regions
+
+
 class TextureCreateTypes(IntEnum):
     PATH = 0
     BYTES = 1
@@ -63,19 +124,24 @@ class TextureCreateTypes(IntEnum):
 
 
 class TextureManager:
-    def __init__(self):
+    def __init__(self, stats: RenderStats | None = None):
         self.textures: dict[str, mgl.Texture] = {}
 
+        self.stats = stats if stats is not None else RenderStats()
+
+        # 各纹理单元当前绑定的纹理名，重复绑定时跳过
+        self.bound_textures: dict[int, str] = {}
+
+        # 图集子图: 名称 -> (图集纹理名, UV 区域 (u, v, w, h), 子图尺寸)
+        self.regions: dict[str, tuple[str, tuple[float, float, float, float], tuple[int, int]]] = {}
+
     def create_texture(self, ctx: mgl.Context, name: str,
                        data: str | bytes | Image.Image, create_type: Literal[0, 1, 2],
                        components: Literal[3, 4] = 4, flip=True, repeat=False,
                        use_mipmaps=False, filter: tuple[int, int] | None = None, replace=True) -> None:
 
-        if name in self.textures:
-            logger.warning(f"纹理 {name} 已存在")
-
-            if not replace:
-                return
+        if not self._prepare_replace(name, replace):
+            return
 
         match create_type:
             case TextureCreateTypes.PATH:
@@ -98,16 +164,108 @@ class TextureManager:
 
         self.textures[name] = new_texture
 
+    def add_texture(self, name: str, texture: mgl.Texture, replace=True) -> None:
+        """
+        添加已创建的纹理 (如帧缓冲的颜色纹理)
+        """
+        if not self._prepare_replace(name, replace):
+            return
+
+        self.textures[name] = texture
+
+    def _prepare_replace(self, name: str, replace: bool) -> bool:
+        """
+        同名纹理已存在时，不替换则返回 False，替换则清除该纹理的绑定记录
+        """
+        if name in self.textures:
+            logger.warning(f"纹理 {name} 已存在")
+
+            if not replace:
+                return False
+
+            self.bound_textures = {location: bound_name for location, bound_name in self.bound_textures.items()
+                                   if bound_name != name}
+
+        return True
+
+    def create_atlas(self, ctx: mgl.Context, name: str,
+                     data: dict[str, str | bytes | Image.Image], create_type: Literal[0, 1, 2],
+                     padding: int = 2, flip=True, use_mipmaps=False,
+                     filter: tuple[int, int] | None = None, replace=True) -> None:
+        """
+        将 data 中的图片打包为名为 name 的图集纹理，子图可以像普通纹理一样按名称使用
+        """
+        images: dict[str, Image.Image] = {}
+
+        for sub_name, sub_data in data.items():
+            match create_type:
+                case TextureCreateTypes.PATH:
+                    with Image.open(sub_data) as image:
+                        images[sub_name] = image.convert("RGBA")
+
+                case TextureCreateTypes.BYTES:
+                    with Image.open(BytesIO(sub_data)) as image:
+                        images[sub_name] = image.convert("RGBA")
+
+                case TextureCreateTypes.IMAGE:
+                    images[sub_name] = sub_data.convert("RGBA")
+
+        atlas, pixel_regions = TextureAtlas.pack(images, padding=padding)
+
+        self.create_texture(ctx, name, atlas, TextureCreateTypes.IMAGE,
+                            flip=flip, use_mipmaps=use_mipmaps, filter=filter, replace=replace)
+
+        atlas_width, atlas_height = atlas.size
+
+        for sub_name, (x, y, w, h) in pixel_regions.items():
+            # 纹理上传时会上下翻转，v 从底部开始计算
+            v = (atlas_height - y - h) if flip else y
+
+            self.regions[sub_name] = (
+                name,
+                (x / atlas_width, v / atlas_height, w / atlas_width, h / atlas_height),
+                (w, h)
+            )
+
+        logger.info(f"已创建图集 {name} ({atlas_width}x{atlas_height}, {len(images)} 张子图)")
+
+    def get_texture_region(self, name: str) -> tuple[str, tuple[float, float, float, float]]:
+        """
+        返回实际绑定的纹理名和 UV 区域，非图集子图时为整张纹理
+        """
+        if name in self.regions:
+            texture_name, uv_rect, _ = self.regions[name]
+
+            return texture_name, uv_rect
+
+        return name, (0.0, 0.0, 1.0, 1.0)
+
     def use_texture(self, name: str, mode: int | None = mgl.TRIANGLES, location: int = 0):
+        if name in self.regions:  # 图集子图绑定整张图集
+            name = self.regions[name][0]
+
         if not name in self.textures:
             logger.warning(f"纹理 {name} 不存在")
 
             return
 
+        if self.bound_textures.get(location) == name:
+            self.stats.texture_bind_skips += 1
+            return
+
         texture = self.textures[name]
 
         texture.use(location=location)
 
+        self.bound_textures[location] = name
+        self.stats.texture_binds += 1
+
+    def invalidate_bindings(self):
+        """
+        纹理在 TextureManager 之外被绑定后调用，下一次 use_texture 时重新绑定
+        """
+        self.bound_textures.clear()
+
     def destroy_texture(self, name: str):
         if not name in self.textures:
             logger.warning(f"销毁的纹理 {name} 不存在")
@@ -120,7 +278,19 @@ class TextureManager:
 
         self.textures.pop(name)
 
+        for location in [location for location, bound_name in self.bound_textures.items()
+                         if bound_name == name]:
+            self.bound_textures.pop(location)
+
+        # 同时移除该图集的子图
+        for sub_name in [sub_name for sub_name, region in self.regions.items()
+                         if region[0] == name]:
+            self.regions.pop(sub_name)
+
     def get_texture_size(self, name: str, default: tuple[int, int] | list[int, int] = (0, 0)):
+        if name in self.regions:
+            return self.regions[name][2]
+
         if not name in self.textures:
             logger.warning(f"纹理 {name} 不存在")
 
@@ -131,4 +301,4 @@ class TextureManager:
         return texture.size
 
     def __contains__(self, name: str):
-        return name in self.textures
+        return name in self.textures or name in self.regions
@@ -1,9 +1,19 @@
+from collections import deque
+import queue
 import re
 import subprocess
+import threading
 
 import tqdm
+from loguru import logger
 
 from .config import Config
+from .yuv_converter import YUVConverter
+
+
+FFMPEG_STDERR_LINES = 50  # ffmpeg 异常退出时输出的 stderr 行数
+
+HITSOUND_AUDIO_PATH = "outout.wav"  # HitSoundMixer.mix_as_file 的默认输出
 
 
 class VideoRenderer:
@@ -25,6 +35,9 @@ class VideoRenderer:
         self.process: subprocess.Popen = None
 
         self.frame_time = 1 / self.video_fps
+        # 启用 gpu_yuv 时输入为 GPU 转换后的 yuv420p 画面 (已翻转)，否则为 rgb24
+        self.frame_size = (YUVConverter.get_frame_size(self.width, self.height) if self.config.gpu_yuv
+                           else self.width * self.height * 3)
 
         self.music_length = 0
         self.total_frame = 0
@@ -32,7 +45,18 @@ class VideoRenderer:
             self.music_length = music_length
             self.total_frame = self.video_fps * self.music_length
 
-        # TODO: 异常情况处理
+        # 写入线程: free_buffers 为可复用的帧缓冲池，全部被占用时 get_buffer 阻塞 (背压)，
+        # frames 为等待写入 ffmpeg 的帧，None 表示结束
+        self.write_queue_size = max(0, self.config.video_write_queue)
+        self.free_buffers: queue.Queue[bytearray] = queue.Queue()
+        self.frames: queue.Queue[bytearray | None] = queue.Queue()
+        self.writer_thread: threading.Thread | None = None
+        self.write_error: Exception | None = None
+
+        self.sync_buffer: bytearray | None = None  # 不使用写入线程时复用的帧缓冲
+
+        self.stderr_lines: deque[str] = deque(maxlen=FFMPEG_STDERR_LINES)
+        self.stderr_thread: threading.Thread | None = None
 
     def set_music_length(self, music_length: float):
         self.music_length = music_length
@@ -41,32 +65,161 @@ class VideoRenderer:
     def get_progress_bar(self) -> tqdm.tqdm:
         return tqdm.tqdm(range(self.total_frame), desc="渲染视频...", unit="帧")
 
-    def create_popen(self):
+    def create_popen(self, audio_path: str | None = HITSOUND_AUDIO_PATH):
+        """
+        启动 ffmpeg，audio_path 为 None 时只输出视频流
+        """
         ffmpeg_command = [
             "ffmpeg", "-y",
             "-f", "rawvideo",
             "-vcodec", "rawvideo",
             "-s", f"{self.width}x{self.height}",
-            "-pix_fmt", "rgb24",
+            "-pix_fmt", "yuv420p" if self.config.gpu_yuv else "rgb24",
             "-r", str(self.video_fps),
             "-i", "-",
-            "-i", "outout.wav",
+            *(("-i", audio_path) if audio_path is not None else ()),
             "-c:v", self.encoder,
             "-b:v", self.video_bitrate,
             "-pix_fmt", "yuv420p",
-            "-c:a", "aac",
-            "-b:a", "128k",  # TODO: 自定义音频比特率
-            "-strict", "experimental",
-            "-vf", "vflip",
+            *(("-c:a", "aac",
+               "-b:a", "128k",  # TODO: 自定义音频比特率
+               "-strict", "experimental") if audio_path is not None else ("-an",)),
+            *(() if self.config.gpu_yuv else ("-vf", "vflip")),
             self.video_output_path
         ]
 
         self.process = subprocess.Popen(
-            ffmpeg_command, stdin=subprocess.PIPE, stderr=subprocess.DEVNULL)
+            ffmpeg_command, stdin=subprocess.PIPE, stderr=subprocess.PIPE)
+
+        # 持续读取 stderr，避免管道写满阻塞 ffmpeg，同时保留最后几行用于报错
+        self.stderr_thread = threading.Thread(
+            target=self._read_stderr, name="ffmpeg-stderr", daemon=True)
+        self.stderr_thread.start()
+
+        if self.write_queue_size:
+            for _ in range(self.write_queue_size):
+                self.free_buffers.put(bytearray(self.frame_size))
+
+            self.writer_thread = threading.Thread(
+                target=self._write_frames, name="ffmpeg-writer", daemon=True)
+            self.writer_thread.start()
+
+    def _read_stderr(self):
+        for line in self.process.stderr:
+            self.stderr_lines.append(line.decode("utf-8", "replace").rstrip())
+
+    def _write_frames(self):
+        while (frame := self.frames.get()) is not None:
+            if self.write_error is None:
+                try:
+                    self.process.stdin.write(frame)
+                except (BrokenPipeError, OSError, ValueError) as e:
+                    self.write_error = e
+
+            # 出错后继续归还缓冲，渲染线程在下一次 get_buffer 时抛出异常
+            self.free_buffers.put(frame)
+
+    def _raise_error(self, error: Exception | None = None):
+        # 管道断开时 ffmpeg 一般已经退出，等待其结束以获取退出码和完整的 stderr
+        try:
+            return_code = self.process.wait(timeout=5)
+            self.stderr_thread.join(timeout=5)
+        except subprocess.TimeoutExpired:
+            return_code = None
+
+        stderr = "\n".join(self.stderr_lines)
+
+        raise RuntimeError(
+            f"ffmpeg 写入失败 (退出码: {return_code}): {error}\n{stderr}") from error
+
+    def get_buffer(self) -> bytearray:
+        """
+        获取一个空闲的帧缓冲，填充后交给 submit_frame，写入队列已满时阻塞
+        """
+        if not self.write_queue_size:
+            if self.sync_buffer is None:
+                self.sync_buffer = bytearray(self.frame_size)
+
+            return self.sync_buffer
+
+        if self.write_error is not None:
+            self._raise_error(self.write_error)
+
+        buffer = self.free_buffers.get()
+
+        if self.write_error is not None:
+            self.free_buffers.put(buffer)
+            self._raise_error(self.write_error)
+
+        return buffer
+
+    def submit_frame(self, buffer: bytearray):
+        """
+        提交由 get_buffer 获取的帧缓冲，写入完成后缓冲回到缓冲池
+        """
+        if not self.write_queue_size:
+            try:
+                self.process.stdin.write(buffer)
+            except (BrokenPipeError, OSError) as e:
+                self._raise_error(e)
+
+            return
+
+        self.frames.put(buffer)
 
     def write_frame(self, data: bytes):
-        self.process.stdin.write(data)
+        buffer = self.get_buffer()
+        buffer[:] = data
+
+        self.submit_frame(buffer)
 
     def close(self):
-        self.process.stdin.close()
+        """
+        等待写入队列中的帧全部写入后关闭 ffmpeg，写入失败或 ffmpeg 异常退出时抛出 RuntimeError
+        """
+        if self.writer_thread is not None:
+            self.frames.put(None)
+            self.writer_thread.join()
+            self.writer_thread = None
+
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError) as e:
+            self.write_error = self.write_error or e
+
         self.process.wait()
+        self.stderr_thread.join()
+
+        if self.write_error is not None or self.process.returncode != 0:
+            self._raise_error(self.write_error)
+
+        logger.info(f"视频已输出到 {self.video_output_path}")
+
+    def abort(self):
+        """
+        渲染失败时调用: 结束 ffmpeg 并停止写入线程，不检查输出结果，可以重复调用
+        """
+        if self.process is None:
+            return
+
+        # 先结束 ffmpeg，阻塞在写入中的写入线程会因管道断开而返回
+        if self.process.poll() is None:
+            self.process.terminate()
+
+        if self.writer_thread is not None:
+            self.frames.put(None)
+            self.writer_thread.join(timeout=5)
+            self.writer_thread = None
+
+        try:
+            self.process.stdin.close()
+        except (BrokenPipeError, OSError):
+            pass
+
+        try:
+            self.process.wait(timeout=5)
+        except subprocess.TimeoutExpired:
+            self.process.kill()
+            self.process.wait()
+
+        self.stderr_thread.join(timeout=5)
@@ -0,0 +1,83 @@
+import os
+
+import moderngl as mgl
+import numpy as np
+
+from .renderer import Renderer
+
+
+class YUVConverter:
+    """
+    将 RGB 画面在 GPU 上转换为垂直翻转后的 I420 (yuv420p) 数据，
+    输出为单通道帧缓冲，宽度与画面相同，按行读取后前 frame_size 字节即为一帧，
+    读取与写入 ffmpeg 的数据量为 RGB 的一半，ffmpeg 也不再需要翻转与颜色空间转换
+    """
+
+    def __init__(self, renderer: Renderer):
+        self.renderer = renderer
+        self.ctx = renderer.ctx
+
+        self.width = renderer.config.width
+        self.height = renderer.config.height
+
+        # 奇数尺寸时色度平面向上取整，与 ffmpeg 的 yuv420p 布局一致
+        self.chroma_width = (self.width + 1) // 2
+        self.chroma_height = (self.height + 1) // 2
+
+        self.frame_size = YUVConverter.get_frame_size(self.width, self.height)
+        self.rows = -(-self.frame_size // self.width)
+
+        self.texture = self.ctx.texture((self.width, self.rows), 1)
+        self.frame_buffer = self.ctx.framebuffer(self.texture)
+
+        shader_dir = os.path.join(renderer.config.resources_dir, "shaders/yuv")
+
+        with open(os.path.join(shader_dir, "yuv.vert")) as vert_file, open(os.path.join(shader_dir, "yuv.frag")) as frag_file:
+            self.program = self.ctx.program(
+                vertex_shader=vert_file.read(), fragment_shader=frag_file.read())
+
+        self.program["texture"] = 0
+        self.program["frameSize"] = (self.width, self.height)
+        self.program["chromaSize"] = (self.chroma_width, self.chroma_height)
+
+        self.vbo = self.ctx.buffer(np.array([
+            -1.0, -1.0,
+            1.0, -1.0,
+            1.0, 1.0,
+            -1.0, 1.0
+        ], dtype="f4"))
+        self.ibo = self.ctx.buffer(np.array([
+            0, 1, 2,
+            0, 3, 2
+        ], dtype="i4"))
+
+        self.vao = self.ctx.vertex_array(
+            self.program, [(self.vbo, "2f", "in_pos")], index_buffer=self.ibo)
+
+    @staticmethod
+    def get_frame_size(width: int, height: int) -> int:
+        return width * height + ((width + 1) // 2) * ((height + 1) // 2) * 2
+
+    def convert(self, texture: mgl.Texture):
+        """
+        转换 texture (一般为 Renderer.frame_buffer 的颜色纹理)，完成后恢复原来绑定的帧缓冲
+        """
+        previous_frame_buffer = self.ctx.fbo
+
+        self.frame_buffer.use()
+
+        texture.use(location=0)
+        self.renderer.texture_manager.invalidate_bindings()
+
+        self.vao.render(mgl.TRIANGLE_STRIP)
+        self.renderer.stats.record_draw(self.program.glo)
+
+        previous_frame_buffer.use()
+
+    def release(self):
+        self.vao.release()
+        self.program.release()
+        self.ibo.release()
+        self.vbo.release()
+        self.frame_buffer.release()
+        self.texture.release()
@@ -0,0 +1,64 @@
+from src.chart import *
+from src.config import Config, ResConfig, ResColors
+
+
+WIDTH, HEIGHT = 800, 600
+BPM = 120
+TICK = 1.875 / BPM  # 每个 tick 的秒数
+
+# 判定线在 tick 64 ~ 192 之间速度为负，floorPosition 倒退
+SPEED_EVENTS = [(0, 64, 1.0), (64, 192, -4.0), (192, 999999999, 1.0)]
+
+HOLD_TIME, HOLD_LENGTH = 32, 300
+
+
+class NullSoundManager:
+    def play_sound(self, name: str):
+        pass
+
+
+def get_floor_position(time: float) -> float:
+    return sum(value * (min(time, end) - start) * TICK
+               for start, end, value in SPEED_EVENTS if time > start)
+
+
+def create_note(type: int, time: int, hold_time: int = 0, x: float = 0.0) -> dict:
+    return {"type": type, "time": time, "positionX": x, "holdTime": hold_time,
+            "speed": 1.0, "floorPosition": get_floor_position(time)}
+
+
+def create_chart(notes: list[dict]) -> PhiChart:
+    line = {
+        "bpm": BPM,
+        "judgeLineMoveEvents": [{"startTime": -999999, "endTime": 999999999,
+                                 "start": 0.5, "end": 0.5, "start2": 0.3, "end2": 0.3}],
+        "judgeLineRotateEvents": [{"startTime": -999999, "endTime": 999999999, "start": 0, "end": 0}],
+        "judgeLineDisappearEvents": [{"startTime": -999999, "endTime": 999999999, "start": 1, "end": 1}],
+        "speedEvents": [{"startTime": start, "endTime": end, "value": value}
+                        for start, end, value in SPEED_EVENTS],
+        "notesAbove": notes,
+        "notesBelow": []
+    }
+
+    PhiDataConverter.init(WIDTH, HEIGHT)
+    Kernels.init(False)
+
+    return ChartParser.parse({"formatVersion": 3, "offset": 0, "judgeLineList": [line]},
+                             Config(width=WIDTH, height=HEIGHT, use_numba=False),
+                             ResConfig(colors=ResColors(line_color=[1, 1, 1])))
+
+
+def test_holding_hold_survives_negative_line_speed():
+    """
+    长按中的长条在判定线 floorPosition 倒退到其 floorPosition 之下时仍需计算和绘制
+    """
+    for notes in ([create_note(PhiNoteTypes.HOLD, HOLD_TIME, HOLD_LENGTH)],
+                  [create_note(PhiNoteTypes.HOLD, HOLD_TIME, HOLD_LENGTH, -2.0),
+                   create_note(PhiNoteTypes.TAP, 400, 0, 2.0)]):
+        chart = create_chart(notes)
+        hold_index = int(np.flatnonzero(chart.notes.type == PhiNoteTypes.HOLD)[0])
+
+        for tick in range(HOLD_TIME + 1, HOLD_TIME + HOLD_LENGTH, 8):
+            chart.update(tick * TICK, NullSoundManager())
+
+            assert hold_index in chart.note_states.indices.tolist(), tick